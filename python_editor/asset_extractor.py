@@ -1,5 +1,7 @@
+import io
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 # Supported extensions and their simple regex patterns
 # This is a basic starting point.
@@ -101,7 +103,17 @@ def get_language(filename):
             return lang, data
     return None, None
 
-def extract_assets_from_file(file_path):
+def extract_assets_from_lines(file_path, lines, data):
+    assets = []
+    for i, line in enumerate(lines):
+        for pattern, asset_type in data['patterns']:
+            match = re.search(pattern, line)
+            if match:
+                name = match.group(1)
+                assets.append(CodeAsset(name, asset_type, file_path, i + 1))
+    return assets
+
+def extract_assets_from_file(file_path, reference_index=None, content_store=None):
     assets = []
     lang, data = get_language(file_path)
     
@@ -109,21 +121,32 @@ def extract_assets_from_file(file_path):
         return assets
 
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-            
-        for i, line in enumerate(lines):
-            for pattern, asset_type in data['patterns']:
-                match = re.search(pattern, line)
-                if match:
-                    name = match.group(1)
-                    assets.append(CodeAsset(name, asset_type, file_path, i + 1))
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        # Same decoding and newline handling as opening the file in text mode
+        lines = io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8', errors='ignore').readlines()
+        
+        cached = None
+        if content_store is not None:
+            # Identical content already scanned (maybe in another checkout): skip parsing
+            content_key = content_store.file_key(os.path.splitext(file_path)[1], raw)
+            cached = content_store.get_scan(content_key)
+        
+        if cached is not None:
+            assets = [CodeAsset(name, asset_type, file_path, line_number) for name, asset_type, line_number in cached]
+        else:
+            assets = extract_assets_from_lines(file_path, lines, data)
+            if content_store is not None:
+                content_store.put_scan(content_key, assets)
+        if reference_index is not None:
+            # Reuse the lines already in memory to record identifier references
+            reference_index.add_file(assets, lines)
     except Exception as e:
         print(f"Error reading {file_path}: {e}")
         
     return assets
 
-def scan_project_assets(root_path):
+def scan_project_assets(root_path, reference_index=None, content_store=None):
     all_assets = []
     # Common directories to ignore
     IGNORED_DIRS = {
@@ -148,7 +171,99 @@ def scan_project_assets(root_path):
                     break
             
             if known_ext:
-                assets = extract_assets_from_file(file_path)
+                assets = extract_assets_from_file(file_path, reference_index, content_store)
                 all_assets.extend(assets)
+    
+    if content_store is not None:
+        content_store.commit()
             
     return all_assets
+
+
+def extract_code_block(lines, line_number):
+    """Extract the code block that starts at line_number (1-based) from a list of lines."""
+    if line_number <= 0:
+        return ''.join(lines)
+
+    start_line = line_number - 1  # 0-indexed
+    if start_line >= len(lines):
+        return None
+
+    # Get the starting indentation level
+    first_line = lines[start_line]
+    base_indent = len(first_line) - len(first_line.lstrip())
+
+    # Find the end of this asset (when indentation returns to base level or less)
+    end_line = start_line + 1
+    for i in range(start_line + 1, len(lines)):
+        line = lines[i]
+        stripped = line.strip()
+
+        # Skip empty lines and comments
+        if not stripped or stripped.startswith('#'):
+            end_line = i + 1
+            continue
+
+        current_indent = len(line) - len(line.lstrip())
+
+        # If we return to base indentation or less, we've exited the block
+        if current_indent <= base_indent and stripped:
+            break
+
+        end_line = i + 1
+
+    return ''.join(lines[start_line:end_line])
+
+def _read_lines(file_path):
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.readlines()
+
+def extract_asset_code(asset):
+    """Extract only the code of a specific asset from its file."""
+    file_path = getattr(asset, 'file_path', None)
+    if not file_path or not os.path.exists(file_path):
+        return None
+    try:
+        return extract_code_block(_read_lines(file_path), getattr(asset, 'line_number', 0))
+    except Exception as e:
+        return f"# Error extracting code: {e}"
+
+def read_files_lines(paths, max_workers=8):
+    """
+    Read several files at once in a thread pool (I/O bound, useful on network
+    drives). Returns {path: lines}, with None for a missing file and the
+    exception for one that could not be read.
+    """
+    def load(file_path):
+        if not file_path or not os.path.exists(file_path):
+            return None
+        try:
+            return _read_lines(file_path)
+        except Exception as e:
+            return e
+
+    paths = list(dict.fromkeys(paths))
+    if len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+            return dict(zip(paths, pool.map(load, paths)))
+    return {path: load(path) for path in paths}
+
+def extract_code_from_lines(lines, asset):
+    """Code of asset from the lines of its file, as returned by read_files_lines."""
+    if lines is None:
+        return None
+    if isinstance(lines, Exception):
+        return f"# Error extracting code: {lines}"
+    return extract_code_block(lines, getattr(asset, 'line_number', 0))
+
+def extract_assets_code(assets, max_workers=8):
+    """
+    Extract the code of many assets at once.
+    Children are grouped by file so each file is read only once, and the reads
+    run in a thread pool. Returns a list aligned with the input order.
+    """
+    file_lines = read_files_lines(
+        [getattr(asset, 'file_path', None) for asset in assets if getattr(asset, 'file_path', None)],
+        max_workers
+    )
+    return [extract_code_from_lines(file_lines.get(getattr(asset, 'file_path', None)), asset) for asset in assets]
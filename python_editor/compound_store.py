@@ -0,0 +1,213 @@
+"""
+Almacén de activos compuestos en un único archivo SQLite.
+Alternativa a los JSON sueltos de la carpeta 'activos': las rutas y los
+nombres se guardan una sola vez (tablas internadas) y todos los compuestos
+se cargan con una única lectura.
+"""
+import os
+import json
+import sqlite3
+import asset_extractor
+
+STORE_FILENAME = "activos.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS compounds (
+    id INTEGER PRIMARY KEY,
+    name_id INTEGER UNIQUE NOT NULL REFERENCES names(id),
+    documentation TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS children (
+    compound_id INTEGER NOT NULL REFERENCES compounds(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name_id INTEGER NOT NULL REFERENCES names(id),
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    line_number INTEGER NOT NULL DEFAULT 0,
+    asset_type TEXT,
+    PRIMARY KEY (compound_id, position)
+) WITHOUT ROWID;
+"""
+
+LOAD_QUERY = """
+SELECT c.id, cn.name, c.documentation, n.name, p.path, ch.line_number, ch.asset_type
+FROM compounds c
+JOIN names cn ON cn.id = c.name_id
+LEFT JOIN children ch ON ch.compound_id = c.id
+LEFT JOIN names n ON n.id = ch.name_id
+LEFT JOIN paths p ON p.id = ch.path_id
+ORDER BY c.id, ch.position
+"""
+
+
+class CompoundStore:
+    """Compuestos guardados en SQLite con tablas de rutas y nombres internados."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+
+    @classmethod
+    def for_folder(cls, activos_folder):
+        return cls(os.path.join(activos_folder, STORE_FILENAME))
+
+    def exists(self):
+        return os.path.exists(self.db_path)
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _intern(self, table, column, value):
+        """Devuelve el id de un valor en una tabla internada, creándolo si hace falta."""
+        cur = self.conn.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,))
+        row = cur.fetchone()
+        if row:
+            return row[0]
+        return self.conn.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (value,)).lastrowid
+
+    def save_compound(self, name, documentation, children):
+        """
+        Crea o actualiza un compuesto. children es una lista de diccionarios con
+        name, file_path, line_number y asset_type (mismo formato que el JSON).
+        """
+        with self.conn:
+            name_id = self._intern("names", "name", name)
+            row = self.conn.execute("SELECT id FROM compounds WHERE name_id = ?", (name_id,)).fetchone()
+            if row:
+                compound_id = row[0]
+                self.conn.execute("UPDATE compounds SET documentation = ? WHERE id = ?", (documentation, compound_id))
+                self.conn.execute("DELETE FROM children WHERE compound_id = ?", (compound_id,))
+            else:
+                compound_id = self.conn.execute(
+                    "INSERT INTO compounds (name_id, documentation) VALUES (?, ?)", (name_id, documentation)
+                ).lastrowid
+
+            rows = []
+            for position, child in enumerate(children):
+                rows.append((
+                    compound_id,
+                    position,
+                    self._intern("names", "name", child.get("name", "Unknown")),
+                    self._intern("paths", "path", child.get("file_path", "")),
+                    child.get("line_number", 0),
+                    child.get("asset_type"),
+                ))
+            self.conn.executemany(
+                "INSERT INTO children (compound_id, position, name_id, path_id, line_number, asset_type) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def delete_compound(self, name):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM compounds WHERE name_id = (SELECT id FROM names WHERE name = ?)", (name,)
+            )
+
+    def load_records(self):
+        """Carga todos los compuestos con una sola consulta, en el formato del JSON."""
+        records = []
+        current_id = None
+        for compound_id, name, documentation, child_name, child_path, line_number, asset_type in self.conn.execute(LOAD_QUERY):
+            if compound_id != current_id:
+                current_id = compound_id
+                records.append({"name": name, "asset_type": "Compound", "documentation": documentation, "children": []})
+            if child_name is not None:
+                child = {"name": child_name, "file_path": child_path, "line_number": line_number}
+                if asset_type is not None:
+                    child["asset_type"] = asset_type
+                records[-1]["children"].append(child)
+        return records
+
+    def load_assets(self, activos_folder):
+        """
+        Construye los CodeAsset de todos los compuestos. Las referencias a otros
+        compuestos se resuelven dentro del almacén (un nivel, como en el JSON).
+        """
+        records = self.load_records()
+        by_name = {record["name"]: record for record in records}
+
+        def resolve(child_data):
+            if child_data.get("asset_type") == "Compound" or child_data.get("file_path", "").endswith(".json"):
+                stem = os.path.splitext(os.path.basename(child_data.get("file_path", "").replace("\\", "/")))[0]
+                return by_name.get(child_data.get("name")) or by_name.get(stem)
+            return None
+
+        assets = []
+        for record in records:
+            children = []
+            for child_data in record["children"]:
+                nested_record = resolve(child_data)
+                child_children = []
+                if nested_record is not None:
+                    for nested_data in nested_record["children"]:
+                        child_children.append(asset_extractor.CodeAsset(
+                            name=nested_data.get("name", "Unknown"),
+                            asset_type=nested_data.get("asset_type", "Reference"),
+                            file_path=nested_data.get("file_path", ""),
+                            line_number=nested_data.get("line_number", 0)
+                        ))
+                children.append(asset_extractor.CodeAsset(
+                    name=child_data.get("name", "Unknown"),
+                    asset_type="Compound" if nested_record is not None else child_data.get("asset_type", "Reference"),
+                    file_path=child_data.get("file_path", ""),
+                    line_number=child_data.get("line_number", 0),
+                    children=child_children
+                ))
+            assets.append(asset_extractor.CodeAsset(
+                name=record["name"],
+                asset_type="Compound",
+                # Misma ruta que en modo JSON para conservar los IDs de documentación
+                file_path=os.path.join(activos_folder, f"{record['name']}.json"),
+                line_number=0,
+                children=children,
+                documentation=record["documentation"]
+            ))
+        return assets
+
+    def import_json_folder(self, activos_folder):
+        """Importa todos los JSON de la carpeta 'activos'. Devuelve cuántos se importaron."""
+        imported = 0
+        for filename in sorted(os.listdir(activos_folder)):
+            if not filename.endswith(".json"):
+                continue
+            json_path = os.path.join(activos_folder, filename)
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.save_compound(
+                    data.get("name", os.path.splitext(filename)[0]),
+                    data.get("documentation", ""),
+                    data.get("children", [])
+                )
+                imported += 1
+            except Exception as e:
+                print(f"Error importing custom asset {filename}: {e}")
+        return imported
+
+    def export_json_folder(self, activos_folder):
+        """Exporta todos los compuestos al formato JSON actual. Devuelve cuántos se exportaron."""
+        os.makedirs(activos_folder, exist_ok=True)
+        records = self.load_records()
+        for record in records:
+            json_path = os.path.join(activos_folder, f"{record['name']}.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(record, f, indent=2, ensure_ascii=False)
+        return len(records)
@@ -0,0 +1,95 @@
+"""
+Almacén direccionado por contenido compartido entre proyectos.
+Permite reutilizar el resultado del escaneo de archivos idénticos (ramas,
+forks, otras copias del mismo código) y encontrar la documentación de un
+activo por el hash de su cuerpo normalizado, aunque cambie de línea o de ruta.
+"""
+import os
+import json
+import hashlib
+import sqlite3
+import textwrap
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_scans (
+    content_hash TEXT PRIMARY KEY,
+    assets TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS docs (
+    body_hash TEXT PRIMARY KEY,
+    doc_path TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def hash_file_content(ext, raw_bytes):
+    """Hash del contenido de un archivo; la extensión forma parte de la clave porque cambia el análisis."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(ext.lower().encode("utf-8") + b"\0")
+    h.update(raw_bytes)
+    return h.hexdigest()
+
+
+def normalize_body(code):
+    """Normaliza el cuerpo de un activo: sin sangría común, espacios finales ni líneas vacías."""
+    lines = [line.rstrip() for line in textwrap.dedent(code.replace("\r\n", "\n")).split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def hash_asset_body(code):
+    """Hash del cuerpo normalizado de un activo, independiente de su posición."""
+    return hashlib.blake2b(normalize_body(code).encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ContentStore:
+    """Resultados de escaneo y documentación indexados por hash de contenido."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def commit(self):
+        if self._conn is not None:
+            self._conn.commit()
+
+    # --- Escaneo ---
+
+    def file_key(self, ext, raw_bytes):
+        return hash_file_content(ext, raw_bytes)
+
+    def get_scan(self, content_hash):
+        """Devuelve [(name, asset_type, line_number), ...] o None si el contenido no se ha visto."""
+        row = self.conn.execute("SELECT assets FROM file_scans WHERE content_hash = ?", (content_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_scan(self, content_hash, assets):
+        """Guarda los activos de un archivo. Se confirma con commit() al final del escaneo."""
+        data = json.dumps([[a.name, a.asset_type, a.line_number] for a in assets], ensure_ascii=False)
+        self.conn.execute("INSERT OR REPLACE INTO file_scans (content_hash, assets) VALUES (?, ?)", (content_hash, data))
+
+    # --- Documentación ---
+
+    def find_doc(self, body_hash):
+        """Ruta de una documentación existente para ese cuerpo de código, o None."""
+        row = self.conn.execute("SELECT doc_path FROM docs WHERE body_hash = ?", (body_hash,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def register_doc(self, body_hash, doc_path):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO docs (body_hash, doc_path) VALUES (?, ?)", (body_hash, os.path.abspath(doc_path)))
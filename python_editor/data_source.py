@@ -0,0 +1,85 @@
+"""
+Data sources for VirtualList.
+A data source is any object with __len__() and get_range(start, end), which
+returns the items of rows [start, end) as a list. Rows that are not
+available yet may be None, and VirtualList draws a placeholder for them.
+A source that loads rows asynchronously calls
+VirtualList.notify_rows_changed(start, end) from the Tk thread once they
+arrive.
+"""
+from collections import OrderedDict
+
+PAGE_SIZE = 256
+MAX_CACHED_PAGES = 64
+
+
+def is_data_source(obj):
+    return hasattr(obj, 'get_range') and hasattr(obj, '__len__')
+
+
+class ListDataSource:
+    """Data source over an already materialized list (no copy)."""
+
+    def __init__(self, items=None):
+        self.items = items if items is not None else []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, idx):
+        return self.items[idx]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def get_range(self, start, end):
+        return self.items[start:end]
+
+
+class PagedDataSource:
+    """
+    Data source that reads fixed-size pages on demand, e.g. from a database
+    cursor (LIMIT/OFFSET) or a columnar store, and keeps the most recently
+    used pages. fetch_page(offset, limit) returns the items of that slice.
+    count is the number of rows, or a callable returning it.
+    """
+
+    def __init__(self, count, fetch_page, page_size=PAGE_SIZE, max_pages=MAX_CACHED_PAGES):
+        self._count = count
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        return self._count() if callable(self._count) else self._count
+
+    def invalidate(self):
+        """Forget the cached pages (the underlying rows changed)."""
+        self._pages.clear()
+
+    def _page(self, number):
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+        page = list(self.fetch_page(number * self.page_size, self.page_size))
+        self._pages[number] = page
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return page
+
+    def get_range(self, start, end):
+        end = min(end, len(self))
+        items = []
+        if start >= end:
+            return items
+        for number in range(start // self.page_size, (end - 1) // self.page_size + 1):
+            page = self._page(number)
+            page_start = number * self.page_size
+            lo = max(start, page_start) - page_start
+            hi = min(end, page_start + self.page_size) - page_start
+            items.extend(page[lo:hi])
+            # A short page means rows that are not there (yet): placeholders
+            items.extend([None] * (hi - lo - len(page[lo:hi])))
+        return items
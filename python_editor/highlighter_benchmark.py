@@ -0,0 +1,636 @@
+"""
+Benchmark and regression suite of the syntax highlighter.
+Runs SyntaxHighlighter.highlight headless, against a recording stub of
+tk.Text, on a generated corpus per language and on real files (this
+folder, or --corpus DIR). Reports tokens per second, Tcl calls issued and
+peak memory, and can compare the throughput with a saved baseline.
+--legacy compares the single-pass Lexer with the previous approach (one
+re.finditer pass per word category and per regex) instead. --check runs
+the correctness checks: the tags of lazy (viewport) highlighting and of
+the incremental highlighter after random edits must equal those of a full
+highlight of the same content.
+
+Usage: python highlighter_benchmark.py [--lines N] [--repeat N] [--corpus DIR]
+           [--save-baseline FILE] [--baseline FILE] [--threshold 0.25] [--legacy] [--check]
+Exit status is 1 when a language is slower than the baseline beyond the
+threshold, or when a check fails.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+import syntax_highlighter
+from incremental_highlighter import IncrementalHighlighter
+from language_detector import detect_language
+from syntax_definitions import LANGUAGES, get_lexer
+from syntax_highlighter import SyntaxHighlighter
+from token_cache import TokenCache
+
+# Line comment marker used to build the generated corpus
+SAMPLE_COMMENTS = {
+    'python': '#', 'ruby': '#', 'bash': '#', 'yaml': '#', 'php': '#',
+    'sql': '--', 'json': None,
+}
+
+# Real files bigger than this are skipped (they would dominate the corpus)
+MAX_REAL_FILE_BYTES = 2 * 1024 * 1024
+DEFAULT_THRESHOLD = 0.25
+
+
+class RecordingText:
+    """
+    Stand-in for tk.Text with the calls the highlighter makes. Every method
+    call counts as one Tcl call; tag_add also counts the index arguments.
+    With record_tags every tag_add is kept in tags as (tag, indices). The
+    view shows visible_lines lines from first_visible, for lazy mode.
+    """
+    def __init__(self, content="", record_tags=False):
+        self.content = content
+        self.tcl_calls = 0
+        self.tag_add_calls = 0
+        self.tagged_ranges = 0
+        self.tags = [] if record_tags else None
+        self.first_visible = 1
+        self.visible_lines = 0
+
+    def reset_counters(self):
+        self.tcl_calls = self.tag_add_calls = self.tagged_ranges = 0
+
+    def tag_config(self, tag, **options):
+        self.tcl_calls += 1
+
+    def tag_add(self, tag, *indices):
+        self.tcl_calls += 1
+        self.tag_add_calls += 1
+        self.tagged_ranges += len(indices) // 2
+        if self.tags is not None:
+            self.tags.append((tag, indices))
+
+    def tag_remove(self, tag, *indices):
+        self.tcl_calls += 1
+
+    def index(self, spec):
+        self.tcl_calls += 1
+        if spec.startswith("@0,"):
+            # Top of the view for y == 0, bottom line otherwise
+            return f"{self.first_visible + (self.visible_lines if int(spec[3:]) else 0)}.0"
+        return "1.0"
+
+    def get(self, start, end=None):
+        self.tcl_calls += 1
+        return self.content
+
+    def winfo_height(self):
+        return self.visible_lines
+
+    def cget(self, option):
+        return ""
+
+    def configure(self, **options):
+        self.tcl_calls += 1
+
+    def bind(self, *args, **kwargs):
+        self.tcl_calls += 1
+
+    def after(self, ms, func=None):
+        if func is not None:
+            func()
+
+    def after_idle(self, func):
+        func()
+
+
+HTML_TAGS = ('div', 'span', 'p', 'a', 'ul', 'li', 'section', 'button', 'img', 'table', 'td')
+HTML_ATTRIBUTES = ('class', 'id', 'href', 'src', 'title', 'data-role', 'style')
+CSS_PROPERTIES = ('color', 'margin', 'padding', 'font-size', 'border', 'width', 'height', 'background')
+MARKDOWN_WORDS = ('editor', 'asset', 'scan', 'prompt', 'highlight', 'token', 'cache', 'list', 'view')
+
+
+def _html_lines(rng, i):
+    """An element with attributes and text, sometimes a comment or a nested list."""
+    tag = rng.choice(HTML_TAGS)
+    attributes = "".join(f' {rng.choice(HTML_ATTRIBUTES)}="value-{rng.randint(0, 500)}"'
+                         for _ in range(rng.randint(0, 3)))
+    indent = "  " * rng.randint(0, 4)
+    roll = rng.random()
+    if roll < 0.1:
+        return [f"{indent}<!-- section {i}: {rng.choice(MARKDOWN_WORDS)} -->"]
+    if roll < 0.25:
+        items = [f"{indent}  <li class='item-{n}'>entry {n}</li>" for n in range(rng.randint(2, 5))]
+        return [f"{indent}<ul{attributes}>"] + items + [f"{indent}</ul>"]
+    return [f"{indent}<{tag}{attributes}>text {rng.choice(MARKDOWN_WORDS)} {i}</{tag}>"]
+
+
+def _css_lines(rng, i):
+    """A rule: class/id selectors and a few properties with units, colors and strings."""
+    selector = ", ".join(rng.choice((f".block-{rng.randint(0, 300)}", f"#node-{rng.randint(0, 300)}",
+                                     f".card-{i} .title"))
+                         for _ in range(rng.randint(1, 3)))
+    lines = [f"/* rule {i} */"] if rng.random() < 0.15 else []
+    lines.append(f"{selector} {{")
+    for _ in range(rng.randint(2, 6)):
+        value = rng.choice((f"{rng.randint(0, 64)}px", f"{rng.randint(1, 4)}rem", f"{rng.randint(0, 100)}%",
+                            f"#{rng.randint(0, 0xFFFFFF):06x}", f"rgba(0, 0, 0, 0.{rng.randint(1, 9)})",
+                            f'"font-{rng.randint(0, 9)}"'))
+        lines.append(f"  {rng.choice(CSS_PROPERTIES)}: {value};")
+    lines.append("}")
+    return lines
+
+
+def _markdown_lines(rng, i):
+    """Headers, lists, paragraphs with emphasis, inline code and links, and code fences."""
+    word = rng.choice(MARKDOWN_WORDS)
+    roll = rng.random()
+    if roll < 0.1:
+        return ["#" * rng.randint(1, 4) + f" Section {i}: {word}", ""]
+    if roll < 0.2:
+        body = [f"    value_{n} = {word}({n})" for n in range(rng.randint(1, 4))]
+        return ["```python"] + body + ["```"]
+    if roll < 0.4:
+        return [f"{rng.choice('-*+')} item {i} with `{word}` and **bold {word}**"]
+    if roll < 0.5:
+        return [f"{rng.randint(1, 9)}. step {i}: see [{word}](https://example.com/{word}/{i})"]
+    return [f"The {word} text {i} has *italic*, __strong__, `code_{i}` and a [link](docs/{word}.md)."]
+
+
+# Languages without word lists get a generator of their own structures
+MARKUP_GENERATORS = {'html': _html_lines, 'css': _css_lines, 'markdown': _markdown_lines}
+
+
+def generate_corpus(lang_name, lang_data, lines=2000, seed=1234):
+    """Build pseudo-code mixing the language's words, identifiers, numbers, strings and comments."""
+    rng = random.Random(seed)
+    markup = MARKUP_GENERATORS.get(lang_name)
+    if markup is not None:
+        out = []
+        while len(out) < lines:
+            out.extend(markup(rng, len(out)))
+        return "\n".join(out[:lines]) + "\n"
+
+    words = []
+    for key in ('keywords', 'constants', 'builtins', 'types', 'self_args', 'functions'):
+        words.extend(lang_data.get(key, []))
+    words = words or ['value', 'item', 'name']
+    comment = SAMPLE_COMMENTS.get(lang_name, '//')
+
+    out = []
+    for i in range(lines):
+        parts = ["    " * rng.randint(0, 3)]
+        for _ in range(rng.randint(3, 8)):
+            roll = rng.random()
+            if roll < 0.35:
+                parts.append(rng.choice(words))
+            elif roll < 0.65:
+                parts.append(f"ident_{rng.randint(0, 500)}")
+            elif roll < 0.8:
+                parts.append(str(rng.randint(0, 99999)))
+            else:
+                parts.append(f'"text {rng.choice(words)} {i}"')
+        if comment and rng.random() < 0.15:
+            parts.append(f"{comment} note {rng.choice(words)}")
+        out.append(" ".join(parts))
+    return "\n".join(out) + "\n"
+
+
+def collect_real_corpora(root):
+    """Concatenate the readable source files under root per detected language: {lang: (files, text)}."""
+    corpora = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in ('__pycache__', 'node_modules')]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                if os.path.getsize(path) > MAX_REAL_FILE_BYTES:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            lang = detect_language(path, text)
+            if lang:
+                files, parts = corpora.setdefault(lang, ([], []))
+                files.append(path)
+                parts.append(text)
+    return {lang: (len(files), "\n".join(parts)) for lang, (files, parts) in corpora.items()}
+
+
+def legacy_tokenize(content, lang_data):
+    """Previous highlighter strategy: a full pass per category, overlapping matches."""
+    tokens = []
+    word_categories = {
+        'keyword': lang_data.get('keywords', []),
+        'constant': lang_data.get('constants', []),
+        'function': lang_data.get('builtins', []),
+        'type': lang_data.get('types', []),
+        'variable': lang_data.get('self_args', []),
+        'sql_function': lang_data.get('functions', []),
+        'boolean': lang_data.get('constants', []),
+    }
+    for tag, words in word_categories.items():
+        if not words:
+            continue
+        pattern = r'\b(' + '|'.join(re.escape(w) for w in words) + r')\b'
+        for match in re.finditer(pattern, content):
+            tokens.append((match.start(), match.end(), tag))
+
+    for key in ('comments', 'strings', 'numbers', 'decorators', 'preprocessor', 'variables', 'tags',
+                'attributes', 'selectors', 'properties', 'headers', 'bold', 'code', 'links', 'keys'):
+        for pat in lang_data.get(key, []):
+            try:
+                for match in re.finditer(pat, content, re.MULTILINE):
+                    tokens.append((match.start(), match.end(), key))
+            except re.error:
+                pass
+    return tokens
+
+
+def time_call(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure_highlight(lang_name, content, repeat):
+    """
+    Highlight content synchronously with an empty token cache each time.
+    Returns a dict with chars, tokens, best time, tokens/s, Tcl calls and peak memory.
+    """
+    text = RecordingText(content)
+    extension = LANGUAGES[lang_name]['extensions'][0]
+
+    def run():
+        highlighter = SyntaxHighlighter(text, token_cache=TokenCache())
+        text.reset_counters()
+        highlighter.highlight(content, f"corpus{extension}", lang_name=lang_name)
+
+    best, _ = time_call(run, repeat)
+    tcl_calls, tagged_ranges = text.tcl_calls, text.tagged_ranges
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tokens = sum(1 for _ in get_lexer(lang_name).tokenize(content))
+    return {
+        'chars': len(content),
+        'tokens': tokens,
+        'ms': best * 1000,
+        'tokens_per_sec': tokens / best if best > 0 else 0.0,
+        'tcl_calls': tcl_calls,
+        'tagged_ranges': tagged_ranges,
+        'peak_kb': peak / 1024,
+    }
+
+
+def run_legacy_comparison(args):
+    print(f"{'language':<12}{'legacy ms':>12}{'lexer ms':>12}{'speedup':>10}{'legacy tok':>12}{'lexer tok':>12}")
+    for lang_name, lang_data in LANGUAGES.items():
+        content = generate_corpus(lang_name, lang_data, args.lines)
+        legacy_time, legacy_tokens = time_call(lambda: legacy_tokenize(content, lang_data), args.repeat)
+        lexer_time, lexer_tokens = time_call(lambda: list(get_lexer(lang_name).tokenize(content)), args.repeat)
+        print(f"{lang_name:<12}{legacy_time * 1000:>12.1f}{lexer_time * 1000:>12.1f}"
+              f"{legacy_time / lexer_time:>9.1f}x{len(legacy_tokens):>12}{len(lexer_tokens):>12}")
+    return 0
+
+
+def run_suite(args):
+    # Measure the synchronous path: the background worker would hide the work
+    syntax_highlighter.BACKGROUND_MIN_CHARS = float('inf')
+
+    cases = []
+    for lang_name, lang_data in LANGUAGES.items():
+        cases.append((f"{lang_name}/generated", lang_name, generate_corpus(lang_name, lang_data, args.lines)))
+    real_root = args.corpus or os.path.dirname(os.path.abspath(__file__))
+    for lang_name, (file_count, content) in sorted(collect_real_corpora(real_root).items()):
+        cases.append((f"{lang_name}/real({file_count})", lang_name, content))
+
+    print(f"{'case':<24}{'chars':>10}{'tokens':>9}{'ms':>9}{'tokens/s':>12}{'tcl calls':>11}{'ranges':>9}{'peak KB':>10}")
+    results = {}
+    for name, lang_name, content in cases:
+        result = measure_highlight(lang_name, content, args.repeat)
+        results[name] = result
+        print(f"{name:<24}{result['chars']:>10}{result['tokens']:>9}{result['ms']:>9.1f}"
+              f"{result['tokens_per_sec']:>12.0f}{result['tcl_calls']:>11}{result['tagged_ranges']:>9}{result['peak_kb']:>10.0f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({name: result['tokens_per_sec'] for name, result in results.items()}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected and result['tokens_per_sec'] < expected * (1 - args.threshold):
+            regressions.append((name, expected, result['tokens_per_sec']))
+    if regressions:
+        print(f"\nThroughput regressions (more than {args.threshold:.0%} below baseline):")
+        for name, expected, actual in regressions:
+            print(f"  {name:<24}{expected:>12.0f} -> {actual:.0f} tokens/s ({actual / expected - 1:+.0%})")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+class EditableText(RecordingText):
+    """
+    RecordingText holding its content like tk.Text (always ending with a
+    newline), for the incremental highlighter: insert/delete/replace through
+    tk.call, 'line.col' and 'end' indices, and the tag of every character.
+    """
+    def __init__(self, content=""):
+        super().__init__(content + "\n")
+        self.char_tags = [None] * len(self.content)
+        self._line_starts = None
+        self._w = "text"
+        self.tk = self
+
+    def call(self, widget, operation, *args):
+        return getattr(self, operation)(*args)
+
+    def _offset(self, index):
+        index = str(index)
+        if index.startswith("end"):
+            return len(self.content) - (1 if index == "end-1c" else 0)
+        line, column = (int(part) for part in index.split("."))
+        if self._line_starts is None:
+            self._line_starts = syntax_highlighter.compute_line_offsets(self.content)
+        if line >= len(self._line_starts):
+            return len(self.content)
+        start = self._line_starts[line - 1]
+        return start + min(column, self._line_starts[line] - 1 - start)
+
+    def index(self, spec):
+        offset = self._offset(spec)
+        line = self.content.count("\n", 0, offset) + 1
+        line_start = self.content.rfind("\n", 0, offset) + 1
+        return f"{line}.{offset - line_start}"
+
+    def get(self, start, end=None):
+        start = self._offset(start)
+        return self.content[start:self._offset(end) if end is not None else start + 1]
+
+    def insert(self, index, chars, *more):
+        offset = min(self._offset(index), len(self.content) - 1)
+        chars = "".join([chars] + list(more[1::2]))
+        self.content = self.content[:offset] + chars + self.content[offset:]
+        self.char_tags[offset:offset] = [None] * len(chars)
+        self._line_starts = None
+
+    def delete(self, start, end=None):
+        # Like Tk, the final newline is never deleted
+        start = min(self._offset(start), len(self.content) - 1)
+        end = min(self._offset(end) if end is not None else start + 1, len(self.content) - 1)
+        if end > start:
+            self.content = self.content[:start] + self.content[end:]
+            del self.char_tags[start:end]
+            self._line_starts = None
+
+    def replace(self, start, end, chars, *more):
+        start = self.index(start)
+        self.delete(start, end)
+        self.insert(start, chars, *more)
+
+    def tag_add(self, tag, *indices):
+        super().tag_add(tag, *indices)
+        for start, end in zip(indices[::2], indices[1::2]):
+            start, end = self._offset(start), self._offset(end)
+            self.char_tags[start:end] = [tag] * (end - start)
+
+    def tag_remove(self, tag, *indices):
+        super().tag_remove(tag, *indices)
+        start, end = self._offset(indices[0]), self._offset(indices[1])
+        tags = self.char_tags[start:end]
+        if tag in tags:
+            self.char_tags[start:end] = [None if old == tag else old for old in tags]
+
+
+def tagged_intervals(text, line_offsets, line_ranges):
+    """
+    Tags recorded by text as {tag: merged [(start, end)] offsets}, clipped to
+    the (first_line, last_line) ranges given, so different call patterns compare.
+    """
+    per_tag = {}
+    for tag, indices in text.tags:
+        offsets = []
+        for index in indices:
+            line, column = (int(part) for part in index.split("."))
+            # Like Tk, a column past the end of the line means its newline
+            line_end = line_offsets[line] - 1 if line < len(line_offsets) else line_offsets[-1]
+            offsets.append(min(line_offsets[line - 1] + column, line_end))
+        per_tag.setdefault(tag, []).extend(zip(offsets[::2], offsets[1::2]))
+    result = {}
+    for tag, intervals in per_tag.items():
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            else:
+                merged.append((start, end))
+        clipped = []
+        for first_line, last_line in line_ranges:
+            low, high = line_offsets[first_line - 1], line_offsets[last_line]
+            clipped.extend((max(start, low), min(end, high)) for start, end in merged if start < high and end > low)
+        if clipped:
+            result[tag] = clipped
+    return result
+
+
+def check_lazy(lang_name, content, views, visible_lines=40):
+    """
+    Highlight content in lazy mode scrolled to each first visible line of
+    views, twice (the second time replayed from the token cache), and compare
+    the tagged lines with a full highlight. Returns a list of error messages.
+    """
+    line_offsets = syntax_highlighter.compute_line_offsets(content)
+    full = RecordingText(content, record_tags=True)
+    SyntaxHighlighter(full, token_cache=TokenCache()).highlight(content, lang_name=lang_name)
+
+    errors = []
+    cache = TokenCache()
+    for attempt in ("lexed", "cached"):
+        text = RecordingText(content, record_tags=True)
+        text.visible_lines = visible_lines
+        text.first_visible = views[0]
+        highlighter = SyntaxHighlighter(text, lazy=True, token_cache=cache)
+        try:
+            highlighter.highlight(content, lang_name=lang_name)
+            for first_visible in views[1:]:
+                text.first_visible = first_visible
+                highlighter._highlight_visible()
+        except Exception as e:
+            errors.append(f"{attempt}: {type(e).__name__}: {e}")
+            continue
+        tagged = highlighter._tagged_ranges
+        if tagged_intervals(text, line_offsets, tagged) != tagged_intervals(full, line_offsets, tagged):
+            errors.append(f"{attempt}: tags differ from a full highlight")
+    return errors
+
+
+def check_shown_parts(lang_name, content, parts=4, visible_lines=40):
+    """
+    Highlight content shown in parts (highlight with shown_chars, then
+    show_more per part, viewing the end of each), as "load more" does, and
+    compare with a full highlight. Nothing may be tagged past the shown text,
+    and show_more must not lex again. Returns a list of error messages.
+    """
+    line_offsets = syntax_highlighter.compute_line_offsets(content)
+    full = RecordingText(content, record_tags=True)
+    SyntaxHighlighter(full, token_cache=TokenCache()).highlight(content, lang_name=lang_name)
+
+    text = RecordingText(content, record_tags=True)
+    text.visible_lines = visible_lines
+    highlighter = SyntaxHighlighter(text, lazy=True, token_cache=TokenCache())
+    lexer = get_lexer(lang_name)
+    lexed_from = []  # Start offset of every tokenize call
+    tokenize = lexer.tokenize
+
+    def recording_tokenize(content, pos=0, *args, **kwargs):
+        lexed_from.append(pos)
+        return tokenize(content, pos, *args, **kwargs)
+
+    errors = []
+    lines = len(line_offsets) - 1
+    lexer.tokenize = recording_tokenize
+    try:
+        for part in range(1, parts + 1):
+            shown_lines = lines * part // parts
+            shown = line_offsets[shown_lines]
+            text.first_visible = max(1, shown_lines - visible_lines + 1)
+            del lexed_from[:]
+            if part == 1:
+                highlighter.highlight(content, lang_name=lang_name, shown_chars=shown)
+            else:
+                highlighter.show_more(shown)
+                # Lexing goes on from where it stopped, never from the start again
+                if 0 in lexed_from:
+                    errors.append(f"part {part}: lexed again from the start")
+            intervals = tagged_intervals(text, line_offsets, [(1, lines)])
+            if any(end > shown for tag_intervals in intervals.values() for _, end in tag_intervals):
+                errors.append(f"part {part}: tags past the shown text")
+    finally:
+        del lexer.tokenize
+    tagged = highlighter._tagged_ranges
+    if tagged_intervals(text, line_offsets, tagged) != tagged_intervals(full, line_offsets, tagged):
+        errors.append("tags differ from a full highlight")
+    return errors
+
+
+def docstring_corpus(lines=2000):
+    """Python code with a docstring over lines 1000-1200, so lazy gaps start inside it."""
+    out = []
+    for i in range(1, lines + 1):
+        if i in (1000, 1200):
+            out.append('"""')
+        elif 1000 < i < 1200:
+            out.append("if x in y and not z: return def class")
+        else:
+            out.append(f"def f{i}(a): return a + {i}  # note")
+    return "\n".join(out) + "\n"
+
+
+# Pieces of text inserted by the random edits, rich in multi-line delimiters
+EDIT_SNIPPETS = ('"""', "'''", '\n', '\n\n', '# note', 'def x():', 'return "text"', ' value ', '"', '\n"""\n')
+
+
+def check_incremental_edits(operation, edits=200, seed=1234):
+    """
+    Apply random edits of one kind through the widget command, as attach()
+    routes them, and compare the tags with a fresh full highlight after each.
+    Returns a list of error messages (at most one: a wrong edit leaves wrong
+    states behind, so the edits after it are not independent).
+    """
+    rng = random.Random(seed)
+    lines = generate_corpus('python', LANGUAGES['python'], 400, seed).splitlines()
+    for line in rng.sample(range(len(lines)), 40):
+        lines[line] = rng.choice(('"""', "'''", '    """docstring', "# comment"))
+    text = EditableText("\n".join(lines))
+    highlighter = IncrementalHighlighter(text)
+    highlighter.highlight(lang_name='python')
+
+    def random_index(line=None):
+        if line is None:
+            line = rng.randint(1, text.content.count("\n"))
+        return text.index(f"{line}.{rng.randint(0, 40)}")
+
+    def random_text():
+        return "".join(rng.choice(EDIT_SNIPPETS) for _ in range(rng.randint(1, 4)))
+
+    mismatches = []
+    for edit in range(edits):
+        # Edits mostly stay on one line and sometimes span a few, like typing and pasting
+        first = random_index()
+        last = max(first, random_index(int(first.split(".")[0]) + rng.choice((0, 0, 0, 1, 3))), key=text._offset)
+        if operation == 'insert':
+            highlighter._dispatch('insert', first, random_text())
+        elif operation == 'delete':
+            highlighter._dispatch('delete', first, last)
+        else:
+            highlighter._dispatch('replace', first, last, random_text())
+        expected = EditableText(text.content[:-1])
+        IncrementalHighlighter(expected).highlight(lang_name='python')
+        if text.char_tags != expected.char_tags:
+            mismatches.append(edit)
+    if not mismatches:
+        return []
+    return [f"{len(mismatches)} of {edits} {operation} edits differ from a full highlight (first: edit {mismatches[0]})"]
+
+
+def run_checks(args):
+    # Synchronous path: the recording text runs after() callbacks right away
+    syntax_highlighter.BACKGROUND_MIN_CHARS = float('inf')
+    prose = "plain words here\n" * 3000
+    checks = [
+        ("lazy: gaps inside a docstring", lambda: check_lazy('python', docstring_corpus(), [1100, 1, 1900, 600])),
+        ("lazy: python without tokens", lambda: check_lazy('python', prose, [1, 1500, 2900])),
+        ("lazy: markdown prose", lambda: check_lazy('markdown', prose, [1500, 1, 2900])),
+        ("lazy: shown in parts", lambda: check_shown_parts('python', docstring_corpus(4000))),
+        ("incremental: inserts", lambda: check_incremental_edits('insert')),
+        ("incremental: deletes", lambda: check_incremental_edits('delete')),
+        ("incremental: replaces", lambda: check_incremental_edits('replace')),
+    ]
+    failures = 0
+    for name, check in checks:
+        errors = check()
+        print(f"{name:<40}{'ok' if not errors else 'FAIL'}")
+        for error in errors:
+            print(f"    {error}")
+        failures += bool(errors)
+    print(f"\n{len(checks) - failures} of {len(checks)} checks passed")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--corpus', help="folder with real source files (default: this folder)")
+    parser.add_argument('--save-baseline', help="write tokens/s per case to this JSON file")
+    parser.add_argument('--baseline', help="fail if tokens/s drops below this JSON baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed throughput drop against the baseline (0.25 = 25%%)")
+    parser.add_argument('--legacy', action='store_true', help="compare with the previous tokenizer instead")
+    parser.add_argument('--check', action='store_true', help="run the correctness checks instead")
+    args = parser.parse_args()
+
+    if args.check:
+        return run_checks(args)
+    if args.legacy:
+        return run_legacy_comparison(args)
+    return run_suite(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+from language_detector import SAMPLE_CHARS
+from syntax_definitions import LANGUAGES, get_lexer
+from syntax_highlighter import SyntaxHighlighter
+
+# Lines lexed per step while looking for the point where the old state resumes
+RELEX_CHUNK_LINES = 200
+
+# State of a line inserted by an edit and not lexed yet; never equal to a real state
+_UNKNOWN = object()
+
+
+class IncrementalHighlighter(SyntaxHighlighter):
+    """
+    Highlighter for editable text. It stores the lexer state at the start of
+    every line: None, or the tag of the multi-line token (string, comment...)
+    that covers the line start. After an edit, lexing restarts at the nearest
+    line at or above the edit that starts outside any token, and stops at the
+    first line below the edit whose new state equals the cached one, so the
+    work per keystroke depends on the size of the edit, not of the file.
+    """
+    def __init__(self, text_widget):
+        super().__init__(text_widget)
+        self.lexer = None
+        self.line_states = []  # line_states[n - 1] is the state at the start of line n
+        self._orig_command = None
+
+    # --- Public API ---
+
+    def highlight(self, content=None, file_path="", lang_name=None):
+        """Set the language (lang_name, or detected) and highlight the whole widget content."""
+        if lang_name is None:
+            if content is None:
+                content = self._text.get("1.0", f"1.0+{SAMPLE_CHARS}c")
+            lang_name, _ = self.get_language(file_path, content)
+        # The open-ended variant lets an unterminated comment/string run to the
+        # end of a chunk, which is how truncated tokens are detected
+        self.lexer = get_lexer(lang_name, open_ended=True) if lang_name in LANGUAGES else None
+        self.rehighlight_all()
+
+    def rehighlight_all(self):
+        line_count = self._line_count()
+        self.line_states = [_UNKNOWN] * line_count
+        for tag in self._all_tags():
+            self._text.tag_remove(tag, "1.0", "end")
+        if self.lexer is not None:
+            self._relex(1, line_count)
+
+    def attach(self):
+        """Intercept insert/delete/replace on the Tk widget to re-highlight incrementally."""
+        if self._orig_command is not None:
+            return
+        widget = self._text
+        self._orig_command = widget._w + "_orig"
+        widget.tk.call("rename", widget._w, self._orig_command)
+        widget.tk.createcommand(widget._w, self._dispatch)
+
+    def detach(self):
+        if self._orig_command is None:
+            return
+        widget = self._text
+        widget.tk.deletecommand(widget._w)
+        widget.tk.call("rename", self._orig_command, widget._w)
+        self._orig_command = None
+
+    def on_edit(self, first_line, line_delta, last_line=None):
+        """
+        Notify an edit that started at first_line and changed the line count by
+        line_delta. last_line is the last line of the edited text after the
+        edit (first_line plus the inserted newlines): a replace can rewrite
+        several lines without changing the count. Call this directly when not
+        using attach().
+        """
+        if line_delta > 0:
+            self.line_states[first_line:first_line] = [_UNKNOWN] * line_delta
+        elif line_delta < 0:
+            del self.line_states[first_line:first_line - line_delta]
+        dirty_last_line = first_line + max(line_delta, 0)
+        if last_line is not None:
+            dirty_last_line = max(dirty_last_line, last_line)
+        if self.lexer is not None:
+            self._relex(first_line, dirty_last_line)
+
+    # --- Internals ---
+
+    def _call(self, *args):
+        if self._orig_command is not None:
+            return self._text.tk.call(self._orig_command, *args)
+        return self._text.tk.call(self._text._w, *args)
+
+    def _dispatch(self, operation, *args):
+        if operation not in ("insert", "delete", "replace") or not args:
+            return self._call(operation, *args)
+        first_line = int(str(self._call("index", args[0])).split(".")[0])
+        # insert index chars ?tags chars tags...?, replace index1 index2 chars ?tags...?
+        if operation == "insert":
+            inserted = args[1::2]
+        elif operation == "replace":
+            inserted = args[2::2]
+        else:
+            inserted = ()
+        last_line = first_line + sum(str(chars).count("\n") for chars in inserted)
+        lines_before = self._line_count()
+        result = self._call(operation, *args)
+        self.on_edit(first_line, self._line_count() - lines_before, last_line)
+        return result
+
+    def _line_count(self):
+        return int(str(self._text.index("end-1c")).split(".")[0])
+
+    def _all_tags(self):
+        return self.lexer.tags if self.lexer is not None else ()
+
+    def _relex(self, first_line, dirty_last_line):
+        """Re-lex from first_line until the cached line states match again after dirty_last_line."""
+        total_lines = self._line_count()
+        if len(self.line_states) != total_lines:
+            # Out of sync (e.g. content replaced without notification): start over
+            self.line_states = [_UNKNOWN] * total_lines
+            first_line, dirty_last_line = 1, total_lines
+
+        line = first_line
+        while line > 1 and self.line_states[line - 1] is not None:
+            line -= 1
+
+        span = RELEX_CHUNK_LINES
+        while True:
+            last_line = min(total_lines, max(dirty_last_line, line) + span)
+            reaches_end = last_line >= total_lines
+            text = self._text.get(f"{line}.0", f"{last_line + 1}.0")
+            tokens = list(self.lexer.tokenize(text, with_groups=True))
+
+            line_offsets = [0]
+            for text_line in text.splitlines(keepends=True):
+                line_offsets.append(line_offsets[-1] + len(text_line))
+
+            # A token reaching the end of a partial chunk may continue further down
+            truncated_at = None
+            if not reaches_end and tokens and tokens[-1][1] >= len(text):
+                truncated_at = tokens[-1][0]
+
+            new_states = self._line_start_states(tokens, line_offsets)
+            stop_line = None
+            for candidate in range(max(dirty_last_line, line) + 1, last_line + 1):
+                if truncated_at is not None and line_offsets[candidate - line] > truncated_at:
+                    break
+                if new_states[candidate - line] == self.line_states[candidate - 1]:
+                    stop_line = candidate
+                    break
+
+            if stop_line is None and not reaches_end:
+                span *= 2
+                continue
+            if stop_line is None:
+                stop_line = total_lines + 1
+            break
+
+        # Store the new states and replace the tags of [line, stop_line)
+        for candidate in range(line, min(stop_line, total_lines + 1)):
+            if candidate - line < len(new_states):
+                self.line_states[candidate - 1] = new_states[candidate - line]
+        stop_offset = line_offsets[min(stop_line - line, len(line_offsets) - 1)]
+        for tag in self._all_tags():
+            self._text.tag_remove(tag, f"{line}.0", f"{stop_line}.0")
+        self._apply_tokens(
+            ((start, min(end, stop_offset), tag) for start, end, tag, _ in tokens if start < stop_offset),
+            line_offsets,
+            first_line=line
+        )
+
+    @staticmethod
+    def _line_start_states(tokens, line_offsets):
+        """State at the start of each line of a chunk: the group of the token covering it, or None."""
+        states = []
+        token_idx = 0
+        for offset in line_offsets:
+            while token_idx < len(tokens) and tokens[token_idx][1] <= offset:
+                token_idx += 1
+            if token_idx < len(tokens) and tokens[token_idx][0] < offset:
+                states.append(tokens[token_idx][3])
+            else:
+                states.append(None)
+        return states
@@ -0,0 +1,130 @@
+import os
+import re
+from syntax_definitions import LANGUAGES, get_language_for_extension
+
+# Only this many characters from the start of the content are classified
+SAMPLE_CHARS = 8192
+# Minimum keyword score to accept a guess; weaker evidence means "unknown"
+MIN_KEYWORD_SCORE = 1.5
+
+# Interpreter named in a shebang line -> language
+SHEBANG_INTERPRETERS = {
+    'python': 'python', 'python2': 'python', 'python3': 'python',
+    'node': 'javascript', 'nodejs': 'javascript', 'deno': 'javascript',
+    'ruby': 'ruby', 'php': 'php',
+    'sh': 'bash', 'bash': 'bash', 'zsh': 'bash', 'dash': 'bash', 'ksh': 'bash',
+}
+
+# Strong markers worth several keywords; the only evidence for languages without keyword lists
+SIGNATURES = [
+    ('php', re.compile(r'<\?php\b'), 10.0),
+    ('html', re.compile(r'<!doctype\s+html|<html[\s>]', re.IGNORECASE), 10.0),
+    ('cpp', re.compile(r'^\s*#\s*include\s*[<"]', re.MULTILINE), 5.0),
+    ('go', re.compile(r'^package\s+\w+\s*$', re.MULTILINE), 5.0),
+    ('java', re.compile(r'\bSystem\.out\.print|^import java\.', re.MULTILINE), 4.0),
+    ('csharp', re.compile(r'^using System|\bConsole\.Write', re.MULTILINE), 4.0),
+    ('javascript', re.compile(r'\bconsole\.log\(|\brequire\(|=>|\bdocument\.'), 2.0),
+    ('kotlin', re.compile(r'^\s*fun \w+\(', re.MULTILINE), 3.0),
+    ('python', re.compile(r'^\s*def \w+\(.*\)\s*(?:->.*)?:\s*$', re.MULTILINE), 3.0),
+    ('rust', re.compile(r'^\s*(?:pub\s+)?fn \w+.*\{', re.MULTILINE), 3.0),
+    ('css', re.compile(r'^[\w.#:\[\]=\-\s,>*]+\{\s*$\s*[\w-]+\s*:', re.MULTILINE), 4.0),
+    ('json', re.compile(r'\A\s*[\[{]\s*"(?:\\.|[^"\\])*"\s*:'), 6.0),
+    ('yaml', re.compile(r'\A---\s*$|^[\w-]+:\s+\S.*$', re.MULTILINE), 1.0),
+    ('markdown', re.compile(r'^#{1,6} \S|^```\w*\s*$', re.MULTILINE), 2.0),
+]
+
+WORD_RE = re.compile(r'[A-Za-z_]\w*')
+
+_keyword_weights = None
+
+
+def _get_keyword_weights():
+    """word -> [(language, weight)]; words shared by many languages weigh less."""
+    global _keyword_weights
+    if _keyword_weights is None:
+        owners = {}
+        for lang, data in LANGUAGES.items():
+            for key in ('keywords', 'types', 'builtins', 'self_args'):
+                for word in data.get(key, []):
+                    owners.setdefault(word, set()).add(lang)
+        _keyword_weights = {
+            word: [(lang, 1.0 / len(langs)) for lang in langs]
+            for word, langs in owners.items()
+        }
+    return _keyword_weights
+
+
+def detect_from_shebang(first_line):
+    """Language named by a '#!' line ('#!/usr/bin/env python3' -> 'python'), or None."""
+    if not first_line.startswith('#!'):
+        return None
+    parts = first_line[2:].strip().split()
+    if not parts:
+        return None
+    interpreter = os.path.basename(parts[0])
+    if interpreter == 'env' and len(parts) > 1:
+        interpreter = parts[1] if not parts[1].startswith('-') else (parts[2] if len(parts) > 2 else '')
+    interpreter = re.sub(r'[\d.]+$', '', interpreter) or interpreter
+    return SHEBANG_INTERPRETERS.get(interpreter)
+
+
+def detect_from_content(content, sample_chars=SAMPLE_CHARS):
+    """
+    Guess the language from the first sample_chars of content: shebang first,
+    then signature patterns and keyword frequency. Returns None when unsure.
+    """
+    sample = content[:sample_chars]
+    if not sample.strip():
+        return None
+    first_line = sample.lstrip('\ufeff').split('\n', 1)[0]
+    lang = detect_from_shebang(first_line)
+    if lang:
+        return lang
+
+    scores = {}
+    for lang, pattern, weight in SIGNATURES:
+        hits = len(pattern.findall(sample))
+        if hits:
+            scores[lang] = scores.get(lang, 0.0) + weight * min(hits, 5)
+
+    weights = _get_keyword_weights()
+    for word in WORD_RE.findall(sample):
+        for lang, weight in weights.get(word, ()):
+            scores[lang] = scores.get(lang, 0.0) + weight
+
+    if not scores:
+        return None
+    lang, score = max(scores.items(), key=lambda item: item[1])
+    return lang if score >= MIN_KEYWORD_SCORE else None
+
+
+def detect_language(file_path="", content=None):
+    """Language of a file: its extension when known, otherwise a guess from the content."""
+    if file_path:
+        lang = get_language_for_extension(os.path.splitext(file_path)[1])
+        if lang:
+            return lang
+    if content:
+        return detect_from_content(content)
+    return None
+
+
+class LanguageDetector:
+    """detect_language() with the result remembered per asset (path + line)."""
+
+    def __init__(self):
+        self._cache = {}
+
+    def detect_asset(self, asset, content=None):
+        file_path = getattr(asset, 'file_path', '') or ''
+        key = (file_path, getattr(asset, 'line_number', 0), getattr(asset, 'name', ''))
+        if key in self._cache:
+            return self._cache[key]
+        lang = detect_language(file_path, content)
+        # An unknown result is only final once content was available to classify
+        if lang is not None or content is not None:
+            self._cache[key] = lang
+        return lang
+
+    def clear(self):
+        self._cache.clear()
@@ -3,29 +3,25 @@ import tkinter as tk
 from tkinter import filedialog
 import os
 import json
+import queue
+import threading
 import asset_extractor
+import prompt_builder
+from compound_store import CompoundStore
+from reference_index import ReferenceIndex
+from content_store import ContentStore, hash_asset_body
 from syntax_highlighter import SyntaxHighlighter
+from language_detector import LanguageDetector, SAMPLE_CHARS, detect_from_content
 from html_editor import HTMLDocEditor
+from tree_model import TreeNode, TreeModel
+from profiler import profiler, ProfilerOverlay
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
-class TreeNode:
-    """Wrapper for assets to display in tree with depth and expansion state."""
-    def __init__(self, asset, depth=0, is_expanded=False):
-        self.asset = asset
-        self.depth = depth
-        self.is_expanded = is_expanded
-        self.is_compound = getattr(asset, 'asset_type', '') == 'Compound'
-        # Use original asset name without modification for consistent display
-        self.name = asset.name if hasattr(asset, 'name') else str(asset)
-        self.asset_type = getattr(asset, 'asset_type', 'default')
-        # Copy other relevant properties from asset for consistent rendering
-        self.file_path = getattr(asset, 'file_path', '')
-        self.line_number = getattr(asset, 'line_number', 0)
-    
-    def __repr__(self):
-        return self.name
+# Visor de código: tamaño de cada inserción por trozos y archivos que se leen en segundo plano
+CODE_INSERT_CHUNK_CHARS = 256 * 1024
+CODE_VIEW_BACKGROUND_BYTES = 1024 * 1024
 
 class CodeEditorApp(ctk.CTk):
     def __init__(self):
@@ -50,14 +46,27 @@ class CodeEditorApp(ctk.CTk):
         self.current_compound_asset = None
         self.navigation_stack = []  # Stack for recursive navigation
         self.expanded_nodes = set()  # Track which nodes are expanded (by asset id)
+        self.tree_model = None  # Filas visibles del árbol de sub-activos
 
         # --- Variables ---
         self.CONFIG_FILE = "config.json"
+        self.CONTENT_STORE_FILE = "content_store.db"  # Compartido entre proyectos
+        self.content_store = ContentStore(self.CONTENT_STORE_FILE)
         self.current_project_path = None
         self.editor_font_size = 14  # Default font size for zoom
         self.docs_folder_path = None  # Carpeta donde se guardan las documentaciones
         self.current_asset = None  # Activo actualmente seleccionado
         self.view_mode = "code"  # "code" o "docs" - modo de visualización actual
+        self.ai_prompt_max_chars = prompt_builder.DEFAULT_MAX_CHARS  # Presupuesto del prompt de IA
+        self.compound_storage = "json"  # "json" (un archivo por compuesto) o "sqlite" (activos.db)
+        self.reference_index = ReferenceIndex()  # Referencias entre activos (llamadores/llamados)
+        self.suggest_depth = 2  # Profundidad de la sugerencia de compuestos
+        self.language_detector = LanguageDetector()  # Lenguaje de cada activo, cacheado
+        self.code_view_max_chars = 2000000  # Caracteres mostrados antes de "cargar más"
+        self.current_asset_code = None  # Código completo del activo mostrado (puede no estar todo en el editor)
+        self._code_view_generation = 0  # Invalida cargas en curso al cambiar de activo
+        self._code_view_shown = 0  # Caracteres de current_asset_code ya insertados
+        self.profiler_overlay = ProfilerOverlay(self)  # Tiempos de redibujado, resaltado, extracción...
         
         # Load Settings (may override font_size)
         self.load_settings()
@@ -221,9 +230,13 @@ class CodeEditorApp(ctk.CTk):
         self.code_editor.bind("<Control-equal>", self.zoom_in)
         self.code_editor.bind("<Control-KP_Add>", self.zoom_in)
         self.code_editor.bind("<Control-KP_Subtract>", self.zoom_out)
+        
+        # Perfilado: F12 activa/desactiva la medición y su panel, Shift+F12 exporta la traza
+        self.bind("<F12>", self.toggle_profiler)
+        self.bind("<Shift-F12>", self.export_profile)
 
         # Initialize Syntax Highlighter
-        self.syntax_highlighter = SyntaxHighlighter(self.code_editor)
+        self.syntax_highlighter = SyntaxHighlighter(self.code_editor, lazy=True)
 
         # --- Sub-assets Tree Panel (Middle - Hidden by default) ---
         self.subassets_panel = ctk.CTkFrame(self, width=250, corner_radius=0)
@@ -312,6 +325,9 @@ class CodeEditorApp(ctk.CTk):
                     self.current_project_path = settings.get("last_directory")
                     self.editor_font_size = settings.get("editor_font_size", 14)
                     self.docs_folder_path = settings.get("docs_folder_path")
+                    self.ai_prompt_max_chars = settings.get("ai_prompt_max_chars", prompt_builder.DEFAULT_MAX_CHARS)
+                    self.compound_storage = settings.get("compound_storage", "json")
+                    self.code_view_max_chars = settings.get("code_view_max_chars", 2000000)
         except Exception as e:
             print(f"Error loading settings: {e}")
 
@@ -320,7 +336,10 @@ class CodeEditorApp(ctk.CTk):
             settings = {
                 "last_directory": self.current_project_path,
                 "editor_font_size": self.editor_font_size,
-                "docs_folder_path": self.docs_folder_path
+                "docs_folder_path": self.docs_folder_path,
+                "ai_prompt_max_chars": self.ai_prompt_max_chars,
+                "compound_storage": self.compound_storage,
+                "code_view_max_chars": self.code_view_max_chars
             }
             with open(self.CONFIG_FILE, "w") as f:
                 json.dump(settings, f)
@@ -356,6 +375,53 @@ class CodeEditorApp(ctk.CTk):
         
         notif.after(2000, notif.destroy)
     
+    def toggle_profiler(self, event=None):
+        """Activa el perfilado y muestra su panel, o lo desactiva y lo oculta."""
+        if self.profiler_overlay.visible:
+            profiler.set_enabled(False)
+            self.profiler_overlay.hide()
+        else:
+            profiler.set_enabled(True)
+            self.profiler_overlay.show()
+        return "break"
+    
+    def export_profile(self, event=None):
+        """Guarda las muestras del perfilador en formato Chrome trace (JSON)."""
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile="perfil.trace.json",
+            filetypes=[("Chrome trace", "*.json")]
+        )
+        if not path:
+            return "break"
+        try:
+            profiler.export_chrome_trace(path)
+            self.show_notification("✓ Perfil exportado")
+        except OSError as e:
+            self.show_notification(f"Error al exportar: {e}", color="#B71C1C")
+        return "break"
+    
+    def run_in_background(self, work, on_done, poll_ms=50):
+        """Ejecuta work() en un hilo y llama a on_done(resultado, error) en el hilo de Tk."""
+        results = queue.Queue()
+        
+        def worker():
+            try:
+                results.put((work(), None))
+            except Exception as e:
+                results.put((None, e))
+        
+        def poll():
+            try:
+                result, error = results.get_nowait()
+            except queue.Empty:
+                self.after(poll_ms, poll)
+                return
+            on_done(result, error)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(poll_ms, poll)
+    
     def get_asset_doc_id(self, asset):
         """Genera un ID único para el archivo de documentación de un activo."""
         import hashlib
@@ -373,9 +439,38 @@ class CodeEditorApp(ctk.CTk):
         doc_id = self.get_asset_doc_id(asset)
         return os.path.join(self.docs_folder_path, f"{doc_id}.md")
     
+    def get_asset_body_hash(self, asset):
+        """Hash del código normalizado del activo (None para compuestos o código no disponible)."""
+        if getattr(asset, 'asset_type', '') == 'Compound':
+            return None
+        code = self.extract_asset_code(asset)
+        if not code or code.startswith("# Error extracting code:"):
+            return None
+        return hash_asset_body(code)
+    
+    def resolve_asset_doc_path(self, asset):
+        """
+        Ruta de la documentación de un activo. Primero se busca por el hash del
+        cuerpo, así todas las copias del proyecto (y el activo movido de línea)
+        leen y escriben el mismo archivo; si no hay ninguno registrado se usa el
+        archivo propio del activo, que queda registrado para ese hash.
+        Devuelve (ruta, hash del cuerpo); la ruta es None sin carpeta de documentación.
+        """
+        doc_path = self.get_asset_doc_path(asset)
+        if not doc_path:
+            return None, None
+        body_hash = self.get_asset_body_hash(asset)
+        if body_hash:
+            shared_path = self.content_store.find_doc(body_hash)
+            if shared_path:
+                return shared_path, body_hash
+            if os.path.exists(doc_path):
+                self.content_store.register_doc(body_hash, doc_path)
+        return doc_path, body_hash
+    
     def load_asset_documentation(self, asset):
         """Carga la documentación de un activo desde el archivo."""
-        doc_path = self.get_asset_doc_path(asset)
+        doc_path, _ = self.resolve_asset_doc_path(asset)
         if not doc_path or not os.path.exists(doc_path):
             return ""
         try:
@@ -399,7 +494,8 @@ class CodeEditorApp(ctk.CTk):
             self.show_notification(f"Error creando carpeta: {e}", "#B71C1C")
             return False
         
-        doc_path = self.get_asset_doc_path(asset)
+        # El mismo archivo que carga load_asset_documentation, compartido por hash
+        doc_path, body_hash = self.resolve_asset_doc_path(asset)
         if not doc_path:
             self.show_notification("No se pudo generar ruta de documentación", "#B71C1C")
             return False
@@ -407,6 +503,8 @@ class CodeEditorApp(ctk.CTk):
         try:
             with open(doc_path, 'w', encoding='utf-8') as f:
                 f.write(content)
+            if body_hash and not self.content_store.find_doc(body_hash):
+                self.content_store.register_doc(body_hash, doc_path)
             return True
         except Exception as e:
             print(f"Error saving documentation to {doc_path}: {e}")
@@ -479,9 +577,13 @@ class CodeEditorApp(ctk.CTk):
             self.load_assets(folder_selected)
             self.save_settings()
 
+    @profiler.timed("scan")
     def load_assets(self, folder_path):
         # import asset_extractor # Imported globally now
-        self.all_assets = asset_extractor.scan_project_assets(folder_path)
+        self.reference_index = ReferenceIndex()
+        self.language_detector.clear()
+        self.all_assets = asset_extractor.scan_project_assets(folder_path, self.reference_index, self.content_store)
+        self.reference_index.build()
         self.load_custom_assets(folder_path)  # Load saved compound assets
         # self.populate_asset_list() # No side panel list to populate initially
 
@@ -492,6 +594,7 @@ class CodeEditorApp(ctk.CTk):
     def hide_search_results(self):
         self.search_results_frame.place_forget()
 
+    @profiler.timed("search")
     def populate_asset_list(self, filter_text=""):
         # This function name is kept for compatibility but logic changes
         if not filter_text:
@@ -654,44 +757,30 @@ class CodeEditorApp(ctk.CTk):
         if not self.current_compound_asset:
             return
         
-        tree_nodes = self.build_tree_list(self.current_compound_asset, depth=0)
-        if tree_nodes:
-            self.subassets_list.set_data(tree_nodes)
+        self.tree_model = TreeModel(self.current_compound_asset, self.expanded_nodes)
+        if len(self.tree_model):
+            self.subassets_list.set_data(self.tree_model)
         else:
+            self.tree_model = None
             self.subassets_list.set_data(["No se encontraron sub-activos"])
     
-    def build_tree_list(self, compound_asset, depth=0):
-        """Build a flat list of TreeNodes representing the expanded tree."""
-        nodes = []
-        children = getattr(compound_asset, 'children', [])
-        
-        for child in children:
-            is_compound = getattr(child, 'asset_type', '') == 'Compound'
-            is_expanded = is_compound and id(child) in self.expanded_nodes
-            node = TreeNode(child, depth, is_expanded)
-            nodes.append(node)
-            
-            # If this child is compound AND expanded, add its children recursively
-            if is_expanded:
-                child_nodes = self.build_tree_list(child, depth + 1)
-                nodes.extend(child_nodes)
-        
-        return nodes
-    
-    def toggle_node_expansion(self, asset):
-        """Toggle expansion state of a compound asset node."""
-        asset_id = id(asset)
-        if asset_id in self.expanded_nodes:
-            self.expanded_nodes.discard(asset_id)
-        else:
-            self.expanded_nodes.add(asset_id)
-        self.refresh_tree_view()
+    def toggle_node_expansion(self, node):
+        """Expand or collapse a compound node in place: only its subtree's rows change."""
+        if self.tree_model is None:
+            return
+        idx = self.tree_model.index_of(node, hint=self.subassets_list.focus_index)
+        if idx < 0:
+            return
+        first_row, inserted, removed = self.tree_model.toggle(idx)
+        self.subassets_list.notify_rows_removed(first_row, removed)
+        self.subassets_list.notify_rows_inserted(first_row, inserted)
     
     def hide_subassets_panel(self):
         """Hide the sub-assets panel and clear navigation."""
         self.current_compound_asset = None
         self.navigation_stack.clear()
         self.expanded_nodes.clear()
+        self.tree_model = None
         self.back_subassets_btn.pack_forget()
         self.subassets_panel.grid_forget()
         self.grid_columnconfigure(1, weight=0, minsize=0)
@@ -714,59 +803,16 @@ class CodeEditorApp(ctk.CTk):
             return
         
         # Check if this sub-asset is also a compound asset
-        if getattr(asset, 'asset_type', '') == 'Compound':
+        if getattr(asset, 'asset_type', '') == 'Compound' and isinstance(clicked_item, TreeNode):
             # Toggle expansion in-place
-            self.toggle_node_expansion(asset)
+            self.toggle_node_expansion(clicked_item)
         else:
             self.show_asset_code(asset)
     
+    @profiler.timed("extract")
     def extract_asset_code(self, asset):
         """Extract only the code of a specific asset from its file."""
-        if not hasattr(asset, 'file_path') or not asset.file_path:
-            return None
-        
-        if not os.path.exists(asset.file_path):
-            return None
-        
-        try:
-            with open(asset.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            if not hasattr(asset, 'line_number') or asset.line_number <= 0:
-                return ''.join(lines)
-            
-            start_line = asset.line_number - 1  # 0-indexed
-            if start_line >= len(lines):
-                return None
-            
-            # Get the starting indentation level
-            first_line = lines[start_line]
-            base_indent = len(first_line) - len(first_line.lstrip())
-            
-            # Find the end of this asset (when indentation returns to base level or less)
-            end_line = start_line + 1
-            for i in range(start_line + 1, len(lines)):
-                line = lines[i]
-                stripped = line.strip()
-                
-                # Skip empty lines and comments
-                if not stripped or stripped.startswith('#'):
-                    end_line = i + 1
-                    continue
-                
-                current_indent = len(line) - len(line.lstrip())
-                
-                # If we return to base indentation or less, we've exited the block
-                if current_indent <= base_indent and stripped:
-                    break
-                
-                end_line = i + 1
-            
-            # Extract the code block
-            return ''.join(lines[start_line:end_line])
-            
-        except Exception as e:
-            return f"# Error extracting code: {e}"
+        return asset_extractor.extract_asset_code(asset)
     
     def show_asset_code(self, asset):
         """Display only the code of an asset in the main editor (read-only)."""
@@ -776,96 +822,145 @@ class CodeEditorApp(ctk.CTk):
         # Actualizar el activo actual
         self.current_asset = asset
         self.asset_name_label.configure(text=f"📄 {asset.name}")
+        self._code_view_generation += 1
+        generation = self._code_view_generation
+        self.syntax_highlighter.cancel()
         
-        # Extract only the asset's code (siempre lo extraemos para tenerlo listo)
-        code = self.extract_asset_code(asset)
+        try:
+            is_large_file = os.path.getsize(asset.file_path) > CODE_VIEW_BACKGROUND_BYTES
+        except OSError:
+            is_large_file = False
+        
+        if is_large_file:
+            # Archivos grandes: se leen en un hilo para no congelar la ventana
+            self.current_asset_code = None
+            self.code_editor.configure(state="normal")
+            self.code_editor.delete("0.0", "end")
+            self.code_editor.insert("0.0", f"# Cargando {asset.name}...")
+            self.code_editor.configure(state="disabled")
+            
+            def on_extracted(code, error):
+                if generation != self._code_view_generation:
+                    return  # Se seleccionó otro activo mientras tanto
+                if error is not None:
+                    code = f"# Error extracting code: {error}"
+                self.display_asset_code(asset, code)
+            
+            self.run_in_background(lambda: self.extract_asset_code(asset), on_extracted)
+        else:
+            # Extract only the asset's code (siempre lo extraemos para tenerlo listo)
+            self.display_asset_code(asset, self.extract_asset_code(asset))
+        
+        # Si estamos en modo documentación, actualizar también la documentación
+        if self.view_mode == "docs":
+            self.refresh_documentation_view()
+    
+    def display_asset_code(self, asset, code):
+        """Pone el código en el editor: de una vez si es pequeño, por trozos si es grande."""
+        self.current_asset_code = code
+        self._code_view_shown = 0
         
         # Actualizar el editor de código (aunque esté oculto)
         self.code_editor.configure(state="normal")
         self.code_editor.delete("0.0", "end")
         if code is None:
             self.code_editor.insert("0.0", f"# No se pudo cargar el código de {asset.name}")
-        else:
+        elif len(code) <= CODE_INSERT_CHUNK_CHARS:
             self.code_editor.insert("0.0", code)
-        # Highlight removed as per user request
-        
+            self._code_view_shown = len(code)
             # Apply syntax highlighting
-            self.syntax_highlighter.highlight(code, asset.file_path)
+            language = self.language_detector.detect_asset(asset, code)
+            self.syntax_highlighter.highlight(code, asset.file_path, lang_name=language)
+        else:
+            # Código grande: inserción progresiva hasta code_view_max_chars. La
+            # generación se toma ahora: si cambia antes de ejecutarse, la carga se descarta
+            generation = self._code_view_generation
+            self.code_editor.after_idle(lambda: self.load_more_code(asset, generation))
         self.code_editor.configure(state="disabled")
+    
+    def load_more_code(self, asset, generation):
+        """
+        Inserta el siguiente bloque de hasta code_view_max_chars de current_asset_code
+        en trozos de CODE_INSERT_CHUNK_CHARS (uno por vuelta del bucle de Tk) y,
+        si queda código, deja al final una línea "cargar más" que continúa la carga.
+        """
+        code = self.current_asset_code
+        if generation != self._code_view_generation or code is None:
+            return
         
-        # Si estamos en modo documentación, actualizar también la documentación
-        if self.view_mode == "docs":
-            self.refresh_documentation_view()
+        def line_boundary(position):
+            """Corta en el final de línea anterior a position para no partir líneas."""
+            if position >= len(code):
+                return len(code)
+            cut = code.rfind("\n", self._code_view_shown, position)
+            return cut + 1 if cut >= 0 else position
+        
+        limit = line_boundary(self._code_view_shown + self.code_view_max_chars)
+        # La primera carga resalta todo el código; las siguientes solo amplían lo mostrado
+        first_load = self._code_view_shown == 0
+        
+        self.code_editor.configure(state="normal")
+        if self.code_editor.tag_ranges("load_more"):
+            self.code_editor.delete("load_more.first", "load_more.last")
+        self.code_editor.configure(state="disabled")
+        
+        def insert_chunk():
+            if generation != self._code_view_generation:
+                return
+            end = line_boundary(min(limit, self._code_view_shown + CODE_INSERT_CHUNK_CHARS))
+            self.code_editor.configure(state="normal")
+            self.code_editor.insert("end-1c", code[self._code_view_shown:end])
+            self._code_view_shown = end
+            
+            if self._code_view_shown < limit:
+                self.code_editor.configure(state="disabled")
+                self.code_editor.after(1, insert_chunk)
+                return
+            
+            if self._code_view_shown < len(code):
+                remaining = len(code) - self._code_view_shown
+                self.code_editor.insert("end-1c", f"⋯ Cargar más ({remaining:,} caracteres restantes) ⋯", "load_more")
+                self.code_editor.tag_config("load_more", foreground="#4FC3F7", underline=True)
+                self.code_editor.tag_bind("load_more", "<Button-1>", lambda e: self.load_more_code(asset, generation))
+            self.code_editor.configure(state="disabled")
+            
+            # Resaltado: el código entero se analiza una vez (en segundo plano si es
+            # largo) y solo se etiqueta lo visible; "cargar más" no vuelve a analizar nada
+            if first_load:
+                language = self.language_detector.detect_asset(asset, code)
+                self.syntax_highlighter.highlight(code, asset.file_path, lang_name=language,
+                                                  shown_chars=self._code_view_shown)
+            else:
+                self.syntax_highlighter.show_more(self._code_view_shown)
+        
+        insert_chunk()
 
     def get_current_asset_extension(self):
-        """Obtiene la extensión del archivo del activo actualmente mostrado."""
-        # Intentar detectar la extensión desde el código mostrado o usar 'python' por defecto
-        code = self.code_editor.get("0.0", "end-1c")
-        if not code.strip():
+        """Obtiene el lenguaje del activo actualmente mostrado (etiqueta del bloque de código)."""
+        # Ruta del activo primero; si no la hay, solo se clasifica el inicio del texto
+        sample = self.code_editor.get("0.0", f"1.0+{SAMPLE_CHARS}c")
+        if not sample.strip():
             return "python"
         
-        # Detectar por indicadores comunes en el código
-        if "def " in code or "class " in code or "import " in code:
-            return "python"
-        elif "function " in code or "const " in code or "let " in code or "var " in code:
-            return "javascript"
-        elif "public class" in code or "private " in code or "void " in code:
-            return "java"
-        elif "#include" in code or "int main" in code:
-            return "cpp"
-        elif "<html" in code.lower() or "<!doctype" in code.lower():
-            return "html"
-        elif "{" in code and "}" in code and ":" in code and ";" not in code:
-            return "json"
-        
-        return "python"  # Default
+        if self.current_asset is not None:
+            language = self.language_detector.detect_asset(self.current_asset, sample)
+        else:
+            language = detect_from_content(sample)
+        return language or "python"  # Default
     
     def get_full_asset_code(self):
-        """Obtiene el código completo del editor (activo actualmente visible)."""
+        """Obtiene el código completo del activo actualmente visible, aunque no esté todo cargado en el editor."""
+        if self.current_asset_code is not None:
+            return self.current_asset_code
         return self.code_editor.get("0.0", "end-1c")
     
     def extract_all_compound_code(self, compound_asset, depth=0):
         """Extrae recursivamente todo el código de un activo compuesto y sus hijos."""
-        code_blocks = []
-        indent = "  " * depth
-        
-        # Añadir encabezado del activo compuesto
-        asset_name = compound_asset.name if hasattr(compound_asset, 'name') else str(compound_asset)
-        code_blocks.append(f"\n{'#' * (depth + 2)} {asset_name}")
-        
-        # Añadir documentación si existe
-        doc = getattr(compound_asset, 'documentation', '')
-        if doc:
-            code_blocks.append(f"\n> Documentación: {doc}")
-        
-        children = getattr(compound_asset, 'children', [])
-        
-        for child in children:
-            child_name = child.name if hasattr(child, 'name') else str(child)
-            child_type = getattr(child, 'asset_type', 'Unknown')
-            
-            if child_type == 'Compound':
-                # Recursivamente extraer código de sub-compuestos
-                child_code = self.extract_all_compound_code(child, depth + 1)
-                code_blocks.append(child_code)
-            else:
-                # Extraer código del activo simple
-                asset_code = self.extract_asset_code(child)
-                
-                if asset_code:
-                    # Detectar extensión del archivo
-                    file_path = getattr(child, 'file_path', '')
-                    ext = os.path.splitext(file_path)[1].lstrip('.') if file_path else 'python'
-                    if not ext:
-                        ext = 'python'
-                    
-                    code_blocks.append(f"\n### {child_name} ({child_type})")
-                    code_blocks.append(f"```{ext}\n{asset_code}\n```")
-                else:
-                    code_blocks.append(f"\n### {child_name} ({child_type})")
-                    code_blocks.append(f"_[No se pudo extraer el código de este activo]_")
-        
-        return "\n".join(code_blocks)
+        extract_code = prompt_builder.prefetch_compound_code(
+            compound_asset, asset_extractor.read_files_lines, asset_extractor.extract_code_from_lines
+        )
+        blocks = prompt_builder.iter_compound_blocks(compound_asset, extract_code, depth=depth)
+        return "\n".join(text for _, text in blocks)
     
     def get_compound_asset_code(self):
         """Obtiene todo el código del activo compuesto actualmente seleccionado."""
@@ -880,15 +975,17 @@ class CodeEditorApp(ctk.CTk):
         is_compound_mode = self.current_compound_asset is not None
         
         if is_compound_mode:
-            # Extraer código de todo el árbol de activos
-            code = self.get_compound_asset_code()
-            compound_name = self.current_compound_asset.name if hasattr(self.current_compound_asset, 'name') else "Activo Compuesto"
+            # El código del árbol se extrae en segundo plano al aceptar
+            compound_asset = self.current_compound_asset
+            compound_name = compound_asset.name if hasattr(compound_asset, 'name') else "Activo Compuesto"
+            has_code = bool(getattr(compound_asset, 'children', []))
         else:
             # Usar el código del editor actual
             code = self.get_full_asset_code()
             compound_name = None
+            has_code = bool(code and code.strip())
         
-        if not code or not code.strip():
+        if not has_code:
             # Mostrar mensaje de error si no hay código
             error_window = ctk.CTkToplevel(self)
             error_window.title("Error")
@@ -981,15 +1078,35 @@ class CodeEditorApp(ctk.CTk):
                 description_textbox.configure(border_color="#B71C1C")
                 return
             
-            # Formatear el prompt según el modo
+            popup.destroy()
+            
+            max_chars = self.ai_prompt_max_chars
             if is_compound_mode:
-                prompt = f"""Necesito que analices y modifiques el siguiente conjunto de código según las instrucciones proporcionadas.
+                def work():
+                    # Lectura por lotes en orden de árbol: cada archivo una vez, en paralelo, y solo lo que cabe
+                    extract_code = prompt_builder.prefetch_compound_code(
+                        compound_asset, asset_extractor.read_files_lines, asset_extractor.extract_code_from_lines
+                    )
+                    return prompt_builder.build_compound_prompt_code(compound_asset, extract_code, max_chars)
+            else:
+                extension = self.get_current_asset_extension()
+                work = lambda: prompt_builder.build_single_prompt_code(code, max_chars=max_chars)
+            
+            def on_built(result, error):
+                if error is not None:
+                    print(f"Error building AI prompt: {error}")
+                    self.show_notification("Error al generar el prompt", "#B71C1C")
+                    return
+                
+                # Formatear el prompt según el modo
+                if is_compound_mode:
+                    prompt = f"""Necesito que analices y modifiques el siguiente conjunto de código según las instrucciones proporcionadas.
 
 ## Activo Compuesto: {compound_name}
 
 El siguiente contenido incluye múltiples archivos/funciones/clases que forman parte de este activo:
 
-{code}
+{result.text}
 
 ## Descripción de la mejora/corrección solicitada:
 {description}
@@ -1003,13 +1120,12 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
   4. El código modificado (después)
 - NO devuelvas el código completo, solo las partes que cambian
 - Si hay múltiples modificaciones en diferentes archivos, sepáralas claramente por archivo"""
-            else:
-                extension = self.get_current_asset_extension()
-                prompt = f"""Necesito que analices y modifiques el siguiente código según las instrucciones proporcionadas.
+                else:
+                    prompt = f"""Necesito que analices y modifiques el siguiente código según las instrucciones proporcionadas.
 
 ## Código actual:
 ```{extension}
-{code}
+{result.text}
 ```
 
 ## Descripción de la mejora/corrección solicitada:
@@ -1023,37 +1139,43 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
   3. El código modificado (después)
 - NO devuelvas el código completo, solo las partes que cambian
 - Si hay múltiples modificaciones, sepáralas claramente"""
+                
+                # Copiar al portapapeles
+                self.clipboard_clear()
+                self.clipboard_append(prompt)
+                self.update()  # Necesario para que el portapapeles persista
+                
+                # Mostrar confirmación breve con el tamaño final
+                confirm = ctk.CTkToplevel(self)
+                confirm.title("")
+                confirm.geometry("320x90")
+                confirm.overrideredirect(True)  # Sin barra de título
+                
+                # Centrar
+                cx = main_x + (main_width // 2) - 160
+                cy = main_y + (main_height // 2) - 45
+                confirm.geometry(f"320x90+{cx}+{cy}")
+                
+                color = "#E65100" if result.was_truncated else "#1B5E20"
+                confirm_frame = ctk.CTkFrame(confirm, fg_color=color, corner_radius=10)
+                confirm_frame.pack(fill="both", expand=True, padx=2, pady=2)
+                
+                size_text = f"{len(prompt):,} caracteres (~{prompt_builder.estimate_tokens(len(prompt)):,} tokens)"
+                if result.was_truncated:
+                    size_text += "\nRecortado por el límite de tamaño"
+                
+                ctk.CTkLabel(
+                    confirm_frame,
+                    text=f"✓ Prompt copiado al portapapeles\n{size_text}",
+                    font=("Arial", 12, "bold"),
+                    text_color="white"
+                ).pack(expand=True)
+                
+                # Auto-cerrar después de 2.5 segundos
+                confirm.after(2500, confirm.destroy)
             
-            # Copiar al portapapeles
-            self.clipboard_clear()
-            self.clipboard_append(prompt)
-            self.update()  # Necesario para que el portapapeles persista
-            
-            popup.destroy()
-            
-            # Mostrar confirmación breve
-            confirm = ctk.CTkToplevel(self)
-            confirm.title("")
-            confirm.geometry("250x80")
-            confirm.overrideredirect(True)  # Sin barra de título
-            
-            # Centrar
-            cx = main_x + (main_width // 2) - 125
-            cy = main_y + (main_height // 2) - 40
-            confirm.geometry(f"250x80+{cx}+{cy}")
-            
-            confirm_frame = ctk.CTkFrame(confirm, fg_color="#1B5E20", corner_radius=10)
-            confirm_frame.pack(fill="both", expand=True, padx=2, pady=2)
-            
-            ctk.CTkLabel(
-                confirm_frame,
-                text="✓ Prompt copiado al portapapeles",
-                font=("Arial", 12, "bold"),
-                text_color="white"
-            ).pack(expand=True)
-            
-            # Auto-cerrar después de 1.5 segundos
-            confirm.after(1500, confirm.destroy)
+            self.show_notification("Generando prompt...", "#4A148C")
+            self.run_in_background(work, on_built)
         
         def cancel():
             popup.destroy()
@@ -1123,7 +1245,7 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
         left_search.grid(row=0, column=0, sticky="e", pady=(0, 8))
 
         from virtual_list import VirtualList
-        available_list = VirtualList(lists_frame, item_height=50, command_double_click=lambda item: add_selected(item))
+        available_list = VirtualList(lists_frame, item_height=50, command_click=lambda item: show_references(item), command_double_click=lambda item: add_selected(item))
         available_list.grid(row=1, column=0, sticky="nsew", padx=(0, 8))
         
         # --- Center Buttons ---
@@ -1155,6 +1277,28 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
                 refresh_available()
                 refresh_selected()
         
+        def add_related(item=None):
+            """Add the asset and everything it references up to suggest_depth."""
+            if item is None:
+                item = available_list.get_clicked_item()
+            if not item:
+                return
+            for asset in [item] + self.reference_index.closure(item, self.suggest_depth):
+                if asset not in selected_assets:
+                    selected_assets.append(asset)
+            refresh_available()
+            refresh_selected()
+        
+        def show_references(item):
+            callees = self.reference_index.callees(item)
+            callers = self.reference_index.callers(item)
+            def names(assets):
+                # Un mismo nombre definido en varios sitios se muestra una sola vez
+                unique = list(dict.fromkeys(a.name for a in assets))
+                shown = ", ".join(unique[:6])
+                return shown + (f" (+{len(unique) - 6})" if len(unique) > 6 else "") if unique else "-"
+            references_label.configure(text=f"Usa: {names(callees)}    ·    Usado por: {names(callers)}")
+        
         def remove_selected(item=None):
             if item is None:
                 item = selected_list.get_clicked_item()
@@ -1169,6 +1313,12 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
         remove_btn = ctk.CTkButton(btn_frame, text="←", width=50, height=45, font=("Segoe UI", 18, "bold"), command=remove_selected, fg_color="#B71C1C", hover_color="#7F0000")
         remove_btn.pack(pady=8)
         
+        related_btn = ctk.CTkButton(btn_frame, text="⇶", width=50, height=45, font=("Segoe UI", 18, "bold"), command=add_related, fg_color="#1565C0", hover_color="#0D47A1")
+        related_btn.pack(pady=8)
+        
+        references_label = ctk.CTkLabel(window, text="", font=("Segoe UI", 12), text_color="#888888", anchor="w", justify="left")
+        references_label.pack(fill="x", padx=20, pady=(0, 8))
+        
         left_search.bind("<KeyRelease>", lambda e: refresh_available())
         
         # Initial population
@@ -1201,10 +1351,18 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
                     "children": [{"name": a.name, "file_path": a.file_path, "line_number": a.line_number, "asset_type": a.asset_type} for a in selected_assets]
                 }
                 
-                # Save JSON
-                json_path = os.path.join(activos_folder, f"{name}.json")
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(asset_data, f, indent=2, ensure_ascii=False)
+                if self.compound_storage == "sqlite":
+                    # Save into the packed store
+                    store = CompoundStore.for_folder(activos_folder)
+                    try:
+                        store.save_compound(name, documentation, asset_data["children"])
+                    finally:
+                        store.close()
+                else:
+                    # Save JSON
+                    json_path = os.path.join(activos_folder, f"{name}.json")
+                    with open(json_path, "w", encoding="utf-8") as f:
+                        json.dump(asset_data, f, indent=2, ensure_ascii=False)
             
             # Create new asset object
             new_asset = asset_extractor.CodeAsset(
@@ -1237,6 +1395,10 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
         if not os.path.exists(activos_folder):
             return
         
+        if self.compound_storage == "sqlite":
+            self.load_store_assets(activos_folder)
+            return
+        
         for filename in os.listdir(activos_folder):
             if filename.endswith(".json"):
                 json_path = os.path.join(activos_folder, filename)
@@ -1293,6 +1455,20 @@ El siguiente contenido incluye múltiples archivos/funciones/clases que forman p
                 except Exception as e:
                     print(f"Error loading custom asset {filename}: {e}")
 
+    def load_store_assets(self, activos_folder):
+        """Load compound assets from the packed SQLite store (one read)."""
+        store = CompoundStore.for_folder(activos_folder)
+        try:
+            if not store.exists():
+                # First use: migrate the existing JSON files
+                store.import_json_folder(activos_folder)
+            for asset in store.load_assets(activos_folder):
+                self.all_assets.insert(0, asset)
+        except Exception as e:
+            print(f"Error loading compound store: {e}")
+        finally:
+            store.close()
+
 
 if __name__ == "__main__":
     app = CodeEditorApp()
@@ -0,0 +1,212 @@
+"""
+Lightweight render-time profiling.
+Spans (named timings with optional counters) are kept per name in ring
+buffers of the last RING_SIZE samples. While the profiler is disabled,
+span() returns a shared no-op object and timed() calls straight through,
+so instrumented code pays one attribute check. F12 in the editor toggles
+profiling and the overlay, Shift+F12 exports a Chrome trace
+(chrome://tracing or https://ui.perfetto.dev).
+"""
+import json
+import os
+import threading
+import time
+import tkinter as tk
+from collections import deque
+from functools import wraps
+
+# Samples kept per span name
+RING_SIZE = 512
+# Overlay refresh period
+OVERLAY_REFRESH_MS = 500
+# Span names shown by the overlay, in order
+OVERLAY_SPANS = ('redraw', 'highlight', 'highlight_apply', 'extract', 'search', 'scan')
+
+
+class _NullSpan:
+    """Returned by span() while disabled: does nothing, allocated once."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **counters):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'counters', 'start')
+
+    def __init__(self, profiler, name, counters):
+        self.profiler = profiler
+        self.name = name
+        self.counters = counters
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start, **self.counters)
+        return False
+
+    def set(self, **counters):
+        """Attach counters (rows drawn, canvas calls...) to the sample."""
+        self.counters.update(counters)
+
+
+class Profiler:
+    """
+    Ring buffers of (start, duration, thread id, counters) samples per span
+    name. Recording is safe from worker threads (deque appends are atomic).
+    """
+    def __init__(self, ring_size=RING_SIZE):
+        self.ring_size = ring_size
+        self.enabled = False
+        self._rings = {}
+        self._origin = time.perf_counter()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+
+    def clear(self):
+        self._rings = {}
+        self._origin = time.perf_counter()
+
+    def span(self, name, **counters):
+        """Context manager timing a block: with profiler.span("redraw") as span: ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, counters)
+
+    def timed(self, name):
+        """Decorator timing every call of a function as a span."""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def record(self, name, start, duration, **counters):
+        ring = self._rings.get(name)
+        if ring is None:
+            ring = self._rings.setdefault(name, deque(maxlen=self.ring_size))
+        ring.append((start, duration, threading.get_ident(), counters))
+
+    def samples(self, name):
+        return list(self._rings.get(name, ()))
+
+    def stats(self, name):
+        """count, last/avg/max milliseconds and the counters of the last sample; None without samples."""
+        samples = self.samples(name)
+        if not samples:
+            return None
+        durations = [duration for _, duration, _, _ in samples]
+        return {
+            'count': len(samples),
+            'last_ms': durations[-1] * 1000,
+            'avg_ms': sum(durations) / len(durations) * 1000,
+            'max_ms': max(durations) * 1000,
+            'last_counters': dict(samples[-1][3]),
+        }
+
+    def summary(self):
+        return {name: self.stats(name) for name in sorted(self._rings)}
+
+    def export_json(self, path):
+        """Write the summary and every kept sample as plain JSON."""
+        data = {
+            'summary': self.summary(),
+            'samples': {
+                name: [{'start_ms': (start - self._origin) * 1000, 'duration_ms': duration * 1000,
+                        'thread': thread, **counters}
+                       for start, duration, thread, counters in self.samples(name)]
+                for name in sorted(self._rings)
+            },
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    def export_chrome_trace(self, path):
+        """Write the samples in the Chrome trace event format, with the summary as otherData."""
+        pid = os.getpid()
+        events = []
+        for name in sorted(self._rings):
+            for start, duration, thread, counters in self.samples(name):
+                events.append({
+                    'name': name, 'ph': 'X', 'pid': pid, 'tid': thread,
+                    'ts': (start - self._origin) * 1e6, 'dur': duration * 1e6,
+                    'args': counters,
+                })
+        events.sort(key=lambda event: event['ts'])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}, f)
+
+
+# Shared instance used by the instrumented modules
+profiler = Profiler()
+
+
+class ProfilerOverlay:
+    """Small always-on-top label in a corner of a window with the latest span timings."""
+
+    def __init__(self, master, profiler=profiler):
+        self.master = master
+        self.profiler = profiler
+        self.label = None
+        self._after_id = None
+
+    @property
+    def visible(self):
+        return self.label is not None
+
+    def show(self):
+        if self.label is None:
+            self.label = tk.Label(self.master, justify="left", anchor="nw", font=("Consolas", 10),
+                                  bg="#111111", fg="#A5D6A7", padx=8, pady=6)
+        self.label.place(relx=1.0, x=-12, y=12, anchor="ne")
+        self.label.lift()
+        self._refresh()
+
+    def hide(self):
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+        if self.label is not None:
+            self.label.destroy()
+            self.label = None
+
+    def format_lines(self):
+        lines = []
+        for name in OVERLAY_SPANS:
+            stats = self.profiler.stats(name)
+            if stats is None:
+                lines.append(f"{name:<16} -")
+                continue
+            line = (f"{name:<16}{stats['last_ms']:7.1f} ms  avg {stats['avg_ms']:6.1f}"
+                    f"  max {stats['max_ms']:7.1f}  n={stats['count']}")
+            counters = stats['last_counters']
+            if counters:
+                line += "  " + "  ".join(f"{key}={value}" for key, value in counters.items())
+            lines.append(line)
+        return lines
+
+    def _refresh(self):
+        self._after_id = None
+        if self.label is None:
+            return
+        self.label.configure(text="\n".join(self.format_lines()))
+        self._after_id = self.master.after(OVERLAY_REFRESH_MS, self._refresh)
@@ -0,0 +1,280 @@
+"""
+Construcción de prompts de IA para activos compuestos.
+Genera el código por bloques, omite activos repetidos entre sub-compuestos
+y respeta un presupuesto máximo de caracteres.
+"""
+import os
+
+# Presupuesto por defecto para el código incluido en el prompt
+DEFAULT_MAX_CHARS = 200000
+# Aproximación habitual: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+# Por debajo de este margen no merece la pena truncar un bloque, se omite entero
+MIN_TRUNCATED_BLOCK = 400
+# Archivos leídos juntos (en paralelo) por cada lote del prompt de un compuesto
+PREFETCH_FILES = 16
+# Caracteres reservados para la nota final "N activos omitidos"
+OMITTED_SUMMARY_RESERVE = 100
+
+
+def estimate_tokens(text_length):
+    """Estima el número de tokens a partir de la longitud en caracteres."""
+    return (text_length + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def get_code_fence_language(file_path):
+    """Devuelve la etiqueta de lenguaje para el bloque de código markdown."""
+    ext = os.path.splitext(file_path)[1].lstrip('.') if file_path else 'python'
+    return ext or 'python'
+
+
+class PromptBudget:
+    """Lleva la cuenta de los caracteres disponibles para el prompt."""
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS):
+        self.max_chars = max_chars
+        self.used = 0
+
+    @property
+    def remaining(self):
+        return max(0, self.max_chars - self.used)
+
+    @property
+    def exhausted(self):
+        return self.used >= self.max_chars
+
+    def charge(self, length):
+        self.used += length
+
+
+class PromptBuildResult:
+    """Resultado del ensamblado: texto final y estadísticas."""
+    def __init__(self, text, truncated_blocks=0, omitted_blocks=0, duplicate_blocks=0):
+        self.text = text
+        self.truncated_blocks = truncated_blocks
+        self.omitted_blocks = omitted_blocks
+        self.duplicate_blocks = duplicate_blocks
+
+    @property
+    def chars(self):
+        return len(self.text)
+
+    @property
+    def tokens(self):
+        return estimate_tokens(len(self.text))
+
+    @property
+    def was_truncated(self):
+        return bool(self.truncated_blocks or self.omitted_blocks)
+
+
+def _asset_key(asset):
+    """Clave de deduplicación: el mismo activo puede aparecer en varios sub-compuestos."""
+    if getattr(asset, 'asset_type', '') == 'Compound':
+        return ('Compound', getattr(asset, 'file_path', ''), getattr(asset, 'name', str(asset)))
+    return (getattr(asset, 'file_path', ''), getattr(asset, 'line_number', 0))
+
+
+def collect_leaf_assets(compound_asset, seen=None):
+    """Lista en orden de árbol los activos simples (sin repetir) de un compuesto."""
+    if seen is None:
+        seen = {_asset_key(compound_asset)}
+    leaves = []
+    for child in getattr(compound_asset, 'children', []):
+        key = _asset_key(child)
+        if key in seen:
+            continue
+        seen.add(key)
+        if getattr(child, 'asset_type', '') == 'Compound':
+            leaves.extend(collect_leaf_assets(child, seen))
+        else:
+            leaves.append(child)
+    return leaves
+
+
+def prefetch_compound_code(compound_asset, read_files, code_from_lines, batch_files=PREFETCH_FILES):
+    """
+    Devuelve una función extract_code(activo) para iter_compound_blocks que
+    lee los archivos por lotes en orden de árbol: al pedir un activo cuyo
+    archivo no está cargado se leen juntos, con read_files(rutas) ->
+    {ruta: líneas}, ese archivo y los siguientes del compuesto hasta
+    batch_files. El código de cada bloque se extrae con code_from_lines solo
+    cuando el generador lo pide, así que tras agotarse el presupuesto no se
+    lee nada más, y las líneas de un archivo se liberan en cuanto se han
+    extraído todos sus activos.
+    """
+    file_order = []  # Rutas en orden de árbol, sin repetir
+    pending = {}  # Ruta -> activos de ese archivo aún no extraídos
+    for leaf in collect_leaf_assets(compound_asset):
+        path = getattr(leaf, 'file_path', '') or ''
+        if path not in pending:
+            pending[path] = 0
+            file_order.append(path)
+        pending[path] += 1
+    position = {path: i for i, path in enumerate(file_order)}
+    loaded = {}
+
+    def extract_code(asset):
+        path = getattr(asset, 'file_path', '') or ''
+        if path not in loaded:
+            start = position.get(path)
+            if start is None:
+                batch = [path]
+            else:
+                batch = [p for p in file_order[start:start + batch_files] if p not in loaded and pending[p] > 0]
+            loaded.update(read_files(batch))
+        code = code_from_lines(loaded.get(path), asset)
+        if path in pending:
+            pending[path] -= 1
+            if pending[path] <= 0:
+                loaded.pop(path, None)
+        return code
+
+    return extract_code
+
+
+def iter_compound_blocks(compound_asset, extract_code, budget=None, depth=0, seen=None):
+    """
+    Genera los bloques del prompt de un activo compuesto como tuplas (tipo, texto).
+    Tipos: 'text' (encabezados y notas), 'code' (bloque de código) y 'omitted'
+    (activo no incluido porque el presupuesto ya se agotó; no se lee su código).
+    """
+    if seen is None:
+        seen = set()
+        seen.add(_asset_key(compound_asset))
+
+    asset_name = compound_asset.name if hasattr(compound_asset, 'name') else str(compound_asset)
+    yield 'text', f"\n{'#' * (depth + 2)} {asset_name}"
+
+    doc = getattr(compound_asset, 'documentation', '')
+    if doc:
+        yield 'text', f"\n> Documentación: {doc}"
+
+    for child in getattr(compound_asset, 'children', []):
+        child_name = child.name if hasattr(child, 'name') else str(child)
+        child_type = getattr(child, 'asset_type', 'Unknown')
+
+        key = _asset_key(child)
+        if key in seen:
+            yield 'duplicate', f"\n### {child_name} ({child_type})\n_[Ya incluido anteriormente en este prompt]_"
+            continue
+        seen.add(key)
+
+        if child_type == 'Compound':
+            yield from iter_compound_blocks(child, extract_code, budget, depth + 1, seen)
+            continue
+
+        header = f"\n### {child_name} ({child_type})"
+        if budget is not None and budget.exhausted:
+            yield 'omitted', header
+            continue
+
+        asset_code = extract_code(child)
+        if asset_code:
+            ext = get_code_fence_language(getattr(child, 'file_path', ''))
+            yield 'text', header
+            yield 'code', f"```{ext}\n{asset_code}\n```"
+        else:
+            yield 'text', header
+            yield 'text', "_[No se pudo extraer el código de este activo]_"
+
+
+def truncate_code_block(block, max_chars):
+    """
+    Recorta un bloque de código markdown por límites de línea, manteniendo la
+    cerradura del bloque y una nota con las líneas omitidas.
+    Devuelve None si no cabe ni la cabecera del bloque.
+    """
+    lines = block.split("\n")
+    # lines[0] es la apertura ```ext y lines[-1] el cierre ```
+    opening, body, closing = lines[0], lines[1:-1], lines[-1]
+    kept = []
+    size = len(opening) + len(closing) + 80  # reserva para la nota de truncado
+    for line in body:
+        if size + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    if not kept:
+        return None
+    omitted = len(body) - len(kept)
+    note = f"... [truncado: {omitted} líneas omitidas por el límite de tamaño]"
+    return "\n".join([opening] + kept + [note, closing])
+
+
+def assemble_prompt(blocks, budget):
+    """
+    Consume los bloques de un generador aplicando el presupuesto a todos ellos
+    (encabezados, notas y código). El bloque de código que no cabe se trunca
+    si queda margen suficiente; a partir de ahí no se emite nada más por
+    activo y el prompt termina con un único resumen de los activos omitidos.
+    """
+    parts = []
+    truncated = omitted = duplicates = 0
+    stopped = False
+    previous_kind = None  # El bloque de código llega justo después de su encabezado
+
+    def stop():
+        nonlocal stopped
+        stopped = True
+        # Agota el presupuesto: iter_compound_blocks deja de leer código
+        budget.charge(budget.remaining)
+
+    for kind, text in blocks:
+        if stopped:
+            if kind in ('code', 'omitted'):
+                omitted += 1
+            elif kind == 'duplicate':
+                duplicates += 1
+            continue
+
+        # Se reserva sitio para el resumen final
+        available = budget.remaining - OMITTED_SUMMARY_RESERVE
+        if len(text) + 1 <= available:
+            if kind == 'duplicate':
+                duplicates += 1
+            elif kind == 'omitted':
+                omitted += 1
+                continue
+            parts.append(text)
+            budget.charge(len(text) + 1)
+            previous_kind = kind
+            continue
+
+        if kind == 'code':
+            shortened = truncate_code_block(text, available) if available >= MIN_TRUNCATED_BLOCK else None
+            if shortened is None:
+                omitted += 1
+                if previous_kind == 'text':
+                    parts.pop()  # Encabezado del activo que no cabe: lo cubre el resumen
+            else:
+                truncated += 1
+                parts.append(shortened)
+                budget.charge(len(shortened) + 1)
+        elif kind == 'omitted':
+            omitted += 1
+        elif kind == 'duplicate':
+            duplicates += 1
+        stop()
+
+    if omitted:
+        parts.append(f"_[{omitted} activos omitidos por el límite de tamaño del prompt]_")
+    return PromptBuildResult("\n".join(parts), truncated, omitted, duplicates)
+
+
+def build_compound_prompt_code(compound_asset, extract_code, max_chars=DEFAULT_MAX_CHARS):
+    """Ensambla el código de un activo compuesto respetando el presupuesto."""
+    budget = PromptBudget(max_chars)
+    blocks = iter_compound_blocks(compound_asset, extract_code, budget)
+    return assemble_prompt(blocks, budget)
+
+
+def build_single_prompt_code(code, file_path="", max_chars=DEFAULT_MAX_CHARS):
+    """Aplica el presupuesto al código de un único activo (sin cercas markdown)."""
+    if len(code) <= max_chars:
+        return PromptBuildResult(code)
+    fence = get_code_fence_language(file_path)
+    shortened = truncate_code_block(f"```{fence}\n{code}\n```", max_chars)
+    if shortened is None:
+        return PromptBuildResult("", omitted_blocks=1)
+    # Quitar las cercas: la plantilla del prompt ya las añade
+    return PromptBuildResult("\n".join(shortened.split("\n")[1:-1]), truncated_blocks=1)
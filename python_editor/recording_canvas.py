@@ -0,0 +1,155 @@
+"""
+Headless stand-in for tk.Canvas with the calls VirtualListCore makes (see
+virtual_list_core.py). Items are kept as plain dicts, the view is a top y
+offset inside the scrollregion, and timers queue up until pump() runs them.
+Every canvas method call is counted per name, as one Tcl call would be.
+"""
+from collections import deque
+
+
+class RecordingEvent:
+    """Minimal Tk event: the fields the list handlers read."""
+    def __init__(self, y=0, delta=0, num=0, state=0, width=0, height=0):
+        self.y = y
+        self.delta = delta
+        self.num = num
+        self.state = state
+        self.width = width
+        self.height = height
+
+
+class RecordingCanvas:
+    def __init__(self, width=400, height=600):
+        self.width = width
+        self.height = height
+        self.top = 0.0
+        self.scrollregion = (0, 0, width, 0)
+        self.items = {}
+        self.bindings = {}
+        self._next_id = 1
+        self._timers = deque()
+        self._next_timer = 1
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.calls = 0
+        self.call_counts = {}
+
+    def _count(self, name):
+        self.calls += 1
+        self.call_counts[name] = self.call_counts.get(name, 0) + 1
+
+    # --- Items ---
+    def _create(self, kind, coords, options):
+        self._count('create_' + kind)
+        if len(coords) == 1 and isinstance(coords[0], (list, tuple)):
+            coords = coords[0]
+        item_id = self._next_id
+        self._next_id += 1
+        self.items[item_id] = {'kind': kind, 'coords': list(coords), 'state': 'normal', **options}
+        return item_id
+
+    def create_polygon(self, *coords, **options):
+        return self._create('polygon', coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create('text', coords, options)
+
+    def coords(self, item_id, *coords):
+        self._count('coords')
+        if len(coords) == 1 and isinstance(coords[0], (list, tuple)):
+            coords = coords[0]
+        if coords:
+            self.items[item_id]['coords'] = list(coords)
+        return self.items[item_id]['coords']
+
+    def itemconfigure(self, item_id, **options):
+        self._count('itemconfigure')
+        self.items[item_id].update(options)
+
+    itemconfig = itemconfigure
+
+    def delete(self, item_id):
+        self._count('delete')
+        if item_id == 'all':
+            self.items.clear()
+        else:
+            self.items.pop(item_id, None)
+
+    # --- View ---
+    def configure(self, **options):
+        self._count('configure')
+        if 'scrollregion' in options:
+            self.scrollregion = tuple(options['scrollregion'])
+
+    config = configure
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def canvasy(self, y):
+        return self.top + y
+
+    def _max_top(self):
+        return max(0.0, self.scrollregion[3] - self.height)
+
+    def yview_moveto(self, fraction):
+        self._count('yview')
+        self.top = float(min(self._max_top(), max(0.0, round(fraction * self.scrollregion[3]))))
+
+    def yview(self, *args):
+        self._count('yview')
+        if args and args[0] == 'moveto':
+            self.yview_moveto(float(args[1]))
+        elif args and args[0] == 'scroll':
+            step = self.height if args[2] == 'pages' else self.height / 10
+            self.top = float(min(self._max_top(), max(0.0, self.top + int(args[1]) * step)))
+
+    def visible_items(self):
+        """Items not hidden whose coordinates reach into the view."""
+        bottom = self.top + self.height
+        shown = []
+        for item in self.items.values():
+            if item['state'] == 'hidden':
+                continue
+            ys = item['coords'][1::2]
+            if ys and max(ys) >= self.top and min(ys) <= bottom:
+                shown.append(item)
+        return shown
+
+    # --- Events and timers ---
+    def bind(self, sequence, handler, add=None):
+        self.bindings[sequence] = handler
+
+    def fire(self, sequence, event=None):
+        """Call the handler bound to sequence, as Tk would on that event."""
+        handler = self.bindings.get(sequence)
+        if handler is not None:
+            return handler(event if event is not None else RecordingEvent())
+
+    def focus_set(self):
+        pass
+
+    def after(self, ms, func=None, *args):
+        timer_id = f"after#{self._next_timer}"
+        self._next_timer += 1
+        self._timers.append((timer_id, func, args))
+        return timer_id
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, timer_id):
+        self._timers = deque(timer for timer in self._timers if timer[0] != timer_id)
+
+    def pump(self, limit=100000):
+        """Run queued timers (and the ones they queue) in order. Returns how many ran."""
+        ran = 0
+        while self._timers and ran < limit:
+            _, func, args = self._timers.popleft()
+            func(*args)
+            ran += 1
+        return ran
@@ -0,0 +1,147 @@
+import os
+import re
+from array import array
+from collections import deque
+from asset_extractor import extract_code_block
+from syntax_definitions import get_language_for_extension, get_lexer
+
+IDENTIFIER_RE = re.compile(r'[A-Za-z_]\w*')
+# Token tags whose text is not code: names mentioned there are not references
+NON_CODE_TAGS = ('comment', 'string')
+
+
+def _asset_key(asset):
+    """Location key, so assets rebuilt from compound JSON still resolve."""
+    return (os.path.normcase(os.path.normpath(getattr(asset, 'file_path', '') or '')), getattr(asset, 'line_number', 0))
+
+
+def code_identifiers(body, lexer=None):
+    """Identifiers of body, leaving out the ones inside comments and strings."""
+    if lexer is None:
+        return set(IDENTIFIER_RE.findall(body))
+    tokens = set()
+    pos = 0
+    for start, end, tag in lexer.tokenize(body):
+        if tag in NON_CODE_TAGS:
+            tokens.update(IDENTIFIER_RE.findall(body, pos, start))
+            pos = end
+    tokens.update(IDENTIFIER_RE.findall(body, pos))
+    return tokens
+
+
+class ReferenceIndex:
+    """
+    Cross-reference index between extracted assets.
+    Each asset body is tokenized into identifiers during the scan; build()
+    matches them against the asset name table and stores the result as
+    compact adjacency arrays (CSR: offsets + targets) for callees and callers.
+    Comments and strings are skipped, and a name defined in several files
+    resolves to the definitions in the same file when there are any.
+    """
+    def __init__(self):
+        self.assets = []
+        self._positions = {}
+        self._pending_tokens = []
+        self.callee_offsets = array('I', [0])
+        self.callee_targets = array('I')
+        self.caller_offsets = array('I', [0])
+        self.caller_targets = array('I')
+
+    def __len__(self):
+        return len(self.assets)
+
+    def add_file(self, assets, lines):
+        """Record the identifiers used by each asset of an already-read file."""
+        lexer = None
+        if assets:
+            lang = get_language_for_extension(os.path.splitext(assets[0].file_path)[1])
+            lexer = get_lexer(lang) if lang else None
+        for asset in assets:
+            body = extract_code_block(lines, asset.line_number) or ''
+            tokens = code_identifiers(body, lexer)
+            tokens.discard(asset.name)  # Definitions mention their own name
+            self._positions[_asset_key(asset)] = len(self.assets)
+            self.assets.append(asset)
+            self._pending_tokens.append(tokens)
+
+    def build(self):
+        """Resolve identifier tokens against the name table into adjacency arrays."""
+        name_table = {}
+        files = []
+        for idx, asset in enumerate(self.assets):
+            name_table.setdefault(asset.name, []).append(idx)
+            files.append(_asset_key(asset)[0])
+
+        callee_offsets = array('I', [0])
+        callee_targets = array('I')
+        in_degree = [0] * len(self.assets)
+        for idx, tokens in enumerate(self._pending_tokens):
+            targets = set()
+            for token in tokens:
+                candidates = name_table.get(token, ())
+                if len(candidates) > 1:
+                    # Ambiguous name: the definitions next to the caller win
+                    local = [target for target in candidates if files[target] == files[idx]]
+                    if local:
+                        candidates = local
+                for target in candidates:
+                    if target != idx:
+                        targets.add(target)
+            for target in sorted(targets):
+                callee_targets.append(target)
+                in_degree[target] += 1
+            callee_offsets.append(len(callee_targets))
+
+        # Transpose into the callers arrays
+        caller_offsets = array('I', [0])
+        for count in in_degree:
+            caller_offsets.append(caller_offsets[-1] + count)
+        caller_targets = array('I', [0]) * len(callee_targets)
+        fill = array('I', caller_offsets[:-1])
+        for source in range(len(self.assets)):
+            for pos in range(callee_offsets[source], callee_offsets[source + 1]):
+                target = callee_targets[pos]
+                caller_targets[fill[target]] = source
+                fill[target] += 1
+
+        self.callee_offsets, self.callee_targets = callee_offsets, callee_targets
+        self.caller_offsets, self.caller_targets = caller_offsets, caller_targets
+        self._pending_tokens = []
+        return self
+
+    def index_of(self, asset):
+        return self._positions.get(_asset_key(asset), -1)
+
+    def _neighbours(self, offsets, targets, asset):
+        idx = self.index_of(asset)
+        if idx < 0 or idx + 1 >= len(offsets):
+            return []
+        return [self.assets[t] for t in targets[offsets[idx]:offsets[idx + 1]]]
+
+    def callees(self, asset):
+        """Assets whose names appear in the body of asset."""
+        return self._neighbours(self.callee_offsets, self.callee_targets, asset)
+
+    def callers(self, asset):
+        """Assets whose bodies mention the name of asset."""
+        return self._neighbours(self.caller_offsets, self.caller_targets, asset)
+
+    def closure(self, asset, max_depth=2):
+        """Transitive callees of asset up to max_depth, in breadth-first order."""
+        start = self.index_of(asset)
+        if start < 0 or start + 1 >= len(self.callee_offsets):
+            return []
+        seen = {start}
+        result = []
+        queue = deque([(start, 0)])
+        while queue:
+            idx, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+            for pos in range(self.callee_offsets[idx], self.callee_offsets[idx + 1]):
+                target = self.callee_targets[pos]
+                if target not in seen:
+                    seen.add(target)
+                    result.append(self.assets[target])
+                    queue.append((target, depth + 1))
+        return result
@@ -0,0 +1,128 @@
+class RowLayout:
+    """
+    Vertical layout of the rows of a list.
+    While every row has the default height the offsets are plain
+    multiplications and nothing is stored. Once heights differ they are kept
+    in a Fenwick tree, so the offset of a row, the row at a given y and a
+    height change are all O(log n).
+    """
+    def __init__(self, count=0, default_height=50, heights=None):
+        self.default_height = default_height
+        self.reset(count, heights=heights)
+
+    def reset(self, count, default_height=None, heights=None):
+        """Lay out count rows, with the given per-row heights or all at the default height."""
+        if default_height is not None:
+            self.default_height = default_height
+        self.count = count
+        self._heights = None
+        self._tree = None
+        self._total = count * self.default_height
+        self.min_height = self.default_height
+        if heights is not None:
+            heights = list(heights)
+            if any(h != self.default_height for h in heights):
+                self._build(heights)
+
+    def _build(self, heights):
+        """Fenwick tree over heights in O(n)."""
+        self.count = len(heights)
+        self._heights = heights
+        tree = [0] + heights
+        for i in range(1, self.count + 1):
+            parent = i + (i & -i)
+            if parent <= self.count:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._total = sum(heights)
+        self.min_height = min(heights) if heights else self.default_height
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def is_uniform(self):
+        return self._tree is None
+
+    @property
+    def total_height(self):
+        return self._total
+
+    def height_of(self, idx):
+        if self._heights is None:
+            return self.default_height
+        return self._heights[idx]
+
+    def offset_of(self, idx):
+        """Top y of row idx (the total height for idx == len)."""
+        if self._tree is None:
+            return idx * self.default_height
+        total = 0
+        i = idx
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def index_at(self, y):
+        """Row containing y, clamped to the existing rows; -1 when there are none."""
+        if self.count == 0:
+            return -1
+        if y <= 0:
+            return 0
+        if self._tree is None:
+            return min(self.count - 1, int(y // self.default_height))
+        # Binary lifting: the largest prefix of rows whose heights add up to <= y
+        pos = 0
+        remaining = y
+        step = 1 << (self.count.bit_length() - 1)
+        tree = self._tree
+        while step:
+            nxt = pos + step
+            if nxt <= self.count and tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= tree[nxt]
+            step >>= 1
+        return min(pos, self.count - 1)
+
+    def visible_range(self, top, bottom):
+        """(start, end) indices of the rows intersecting [top, bottom)."""
+        if self.count == 0:
+            return 0, 0
+        return self.index_at(top), min(self.count, self.index_at(bottom) + 1)
+
+    def set_height(self, idx, height):
+        """Change the height of one row in O(log n)."""
+        if height == self.height_of(idx):
+            return
+        if self._tree is None:
+            self._build([self.default_height] * self.count)
+        delta = height - self._heights[idx]
+        self._heights[idx] = height
+        self._total += delta
+        self.min_height = min(self.min_height, height)
+        i = idx + 1
+        while i <= self.count:
+            self._tree[i] += delta
+            i += i & -i
+
+    def insert(self, idx, count, heights=None):
+        """Insert count rows before idx. O(1) for default-height rows in a uniform layout, else O(n)."""
+        if heights is not None:
+            heights = list(heights)
+        if self._tree is None and (heights is None or all(h == self.default_height for h in heights)):
+            self.count += count
+            self._total += count * self.default_height
+            return
+        current = self._heights if self._heights is not None else [self.default_height] * self.count
+        new_rows = heights if heights is not None else [self.default_height] * count
+        self._build(current[:idx] + new_rows + current[idx:])
+
+    def delete(self, idx, count):
+        """Remove count rows starting at idx. O(1) in a uniform layout, else O(n)."""
+        count = max(0, min(count, self.count - idx))
+        if self._tree is None:
+            self.count -= count
+            self._total -= count * self.default_height
+            return
+        self._build(self._heights[:idx] + self._heights[idx + count:])
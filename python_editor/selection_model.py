@@ -0,0 +1,115 @@
+"""
+Row keys and selection state for VirtualList.
+Every item gets a small integer key that stays the same while the list is
+rebuilt (TreeNode wrappers are recreated on each expansion, but wrap the
+same asset), and the selection is a bytearray indexed by that key. Keys
+come from a RowKeys table owned by each list.
+"""
+
+
+def row_identity(item):
+    """What makes two items the same row: the wrapped asset's type, name and location."""
+    target = getattr(item, 'asset', item)
+    if hasattr(target, 'name') and hasattr(target, 'file_path'):
+        return (getattr(target, 'asset_type', ''), target.name, target.file_path, getattr(target, 'line_number', 0))
+    try:
+        hash(target)
+    except TypeError:
+        return ('id', id(target))
+    return target
+
+
+class RowKeys:
+    """
+    Identity of an item -> dense integer key, for the rows of one list.
+    The list clears it when new data comes in with nothing selected, so it
+    only holds the rows of the current data (plus those of a live selection).
+    """
+    def __init__(self):
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def key(self, item):
+        """Stable integer key of an item."""
+        identity = row_identity(item)
+        key = self._keys.get(identity)
+        if key is None:
+            key = self._keys[identity] = len(self._keys)
+        return key
+
+    def clear(self):
+        self._keys.clear()
+
+
+class SelectionModel:
+    """
+    Set of selected row keys stored as one byte per key.
+    select_all() only flips the meaning of the bytes (a set byte then marks a
+    deselected row), so it is O(1) whatever the number of rows.
+    """
+    def __init__(self):
+        self._bits = bytearray()
+        self._inverted = False
+        self._items = {}  # key -> item for the rows selected one by one
+        self.anchor = -1  # Row index where a range selection starts
+
+    @property
+    def inverted(self):
+        return self._inverted
+
+    @property
+    def empty(self):
+        """True when no row is selected."""
+        return not self._inverted and not any(self._bits)
+
+    def is_selected(self, key):
+        bits = self._bits
+        flag = bits[key] if key < len(bits) else 0
+        return bool(flag) != self._inverted
+
+    def set(self, key, selected, item=None):
+        bits = self._bits
+        flag = 1 if selected != self._inverted else 0
+        if key < len(bits):
+            bits[key] = flag
+        elif flag:
+            # Grow geometrically so a run of new keys costs O(1) amortized each
+            bits.extend(bytes(max(key + 1 - len(bits), len(bits))))
+            bits[key] = flag
+        if selected and item is not None:
+            self._items[key] = item
+        elif not selected:
+            self._items.pop(key, None)
+
+    def toggle(self, key, item=None):
+        selected = not self.is_selected(key)
+        self.set(key, selected, item)
+        return selected
+
+    def set_range(self, keyed_items, selected):
+        """Select or deselect every (key, item) pair of a row range."""
+        for key, item in keyed_items:
+            self.set(key, selected, item)
+
+    def select_all(self):
+        self._bits = bytearray()
+        self._inverted = True
+        self._items.clear()
+
+    def clear(self):
+        self._bits = bytearray()
+        self._inverted = False
+        self._items.clear()
+
+    def selected_items(self, rows=None):
+        """
+        Selected items in selection order. After select_all() the rows are not
+        known here: rows (an iterable of (key, item)) is filtered instead.
+        """
+        if not self._inverted:
+            return [item for key, item in self._items.items() if self.is_selected(key)]
+        if rows is None:
+            return []
+        return [item for key, item in rows if self.is_selected(key)]
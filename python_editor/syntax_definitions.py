@@ -1,3 +1,4 @@
+import re
 
 # VS Code Dark+ Color Scheme
 COLORS = {
@@ -304,3 +305,157 @@ LANGUAGES = {
         'italic': [r'\*.*?\*', r'_.*?_']
     }
 }
+
+# --- Single-pass lexer ---
+
+# Regex-based categories: (key in LANGUAGES, color tag), in precedence order.
+# At a given position the first alternative that matches wins, so comments and
+# strings shadow keywords inside them and tokens never overlap.
+REGEX_CATEGORIES = [
+    ('comments', 'comment'),
+    ('strings', 'string'),
+    ('decorators', 'decorator'),
+    ('preprocessor', 'keyword'),
+    ('variables', 'variable'),   # PHP/Ruby/Bash vars
+    ('tags', 'tag'),             # HTML
+    ('attributes', 'attribute'), # HTML
+    ('selectors', 'selector'),   # CSS
+    ('properties', 'property'),  # CSS
+    ('headers', 'constant'),     # MD
+    ('bold', 'bold'),            # MD
+    ('code', 'code'),            # MD
+    ('links', 'string'),         # MD
+    ('keys', 'variable'),        # YAML/JSON
+    ('numbers', 'number'),
+]
+
+# Word-list categories: (key in LANGUAGES, color tag), matched as \b(...)\b
+WORD_CATEGORIES = [
+    ('keywords', 'keyword'),
+    ('constants', 'constant'),
+    ('builtins', 'function'),
+    ('types', 'type'),
+    ('self_args', 'variable'),
+    ('functions', 'function'),   # SQL
+]
+
+# Plain identifiers are matched by a single group and classified with a dict
+# lookup, instead of trying every word alternative at each position
+_IDENTIFIER = r'[A-Za-z_]\w*'
+_IDENTIFIER_RE = re.compile(_IDENTIFIER + r'\Z')
+_BACKREF_RE = re.compile(r'(?<!\\)\\(\d+)')
+_WORD_GROUP = 'word'
+# Categories whose tokens may span several lines
+MULTILINE_CATEGORIES = ('comments', 'strings', 'code')
+_DELIMITED_RE = re.compile(r'(.+\)\*)(\\?.)\Z', re.DOTALL)
+
+
+def _open_ended(pattern):
+    r"""
+    Variant of a multi-line pattern that also matches an unterminated token up
+    to the end of the input, e.g. '/\*[\s\S]*?\*/' -> '/\*[\s\S]*?(?:\*/|\Z)'.
+    Used when lexing part of a document, to tell a truncated token from plain code.
+    """
+    if r'[\s\S]*?' in pattern:
+        head, close = pattern.rsplit(r'[\s\S]*?', 1)
+        return head + r'[\s\S]*?(?:' + close + r'|\Z)'
+    match = _DELIMITED_RE.match(pattern)
+    if match:
+        # '"(?:\\.|[^"\\])*"' style: repeated body followed by one closing character
+        return match.group(1) + '(?:' + match.group(2) + r'|\Z)'
+    return pattern
+
+
+class Lexer:
+    """One master regex with a named group per pattern, scanned in a single pass."""
+
+    def __init__(self, lang_data, open_ended=False):
+        alternatives = []
+        self.group_tags = {}
+        self.word_tags = {}
+        group_count = 0
+
+        def add(pattern, tag, name=None):
+            nonlocal group_count
+            try:
+                inner_groups = re.compile(pattern).groups
+            except re.error:
+                return
+            name = name or f"g{len(alternatives)}"
+            # Numbered backreferences shift once the pattern is embedded
+            offset = group_count + 1
+            if inner_groups:
+                pattern = _BACKREF_RE.sub(lambda m: '\\' + str(int(m.group(1)) + offset), pattern)
+            alternatives.append(f"(?P<{name}>{pattern})")
+            self.group_tags[name] = tag
+            group_count += 1 + inner_groups
+
+        for key, tag in REGEX_CATEGORIES:
+            for pattern in lang_data.get(key, []):
+                if open_ended and key in MULTILINE_CATEGORIES:
+                    pattern = _open_ended(pattern)
+                add(pattern, tag)
+
+        # Words that are plain identifiers go to the lookup table (first category
+        # wins); the rest (e.g. Ruby's 'defined?') keep a regex alternative
+        for key, tag in WORD_CATEGORIES:
+            other_words = []
+            for word in lang_data.get(key, []):
+                if _IDENTIFIER_RE.match(word):
+                    self.word_tags.setdefault(word, tag)
+                else:
+                    other_words.append(word)
+            if other_words:
+                add(r'(?:' + '|'.join(re.escape(w) for w in other_words) + r')(?!\w)', tag)
+        if self.word_tags:
+            add(_IDENTIFIER, None, name=_WORD_GROUP)
+
+        self.pattern = re.compile('|'.join(alternatives), re.MULTILINE)
+        self.tags = {tag for tag in self.group_tags.values() if tag is not None} | set(self.word_tags.values())
+
+    def tokenize(self, content, pos=0, endpos=None, with_groups=False):
+        """
+        Yield non-overlapping (start, end, tag) tokens in order. With with_groups
+        the name of the matching pattern group is appended to each token.
+        """
+        group_tags = self.group_tags
+        word_tags = self.word_tags
+        if endpos is None:
+            endpos = len(content)
+        for match in self.pattern.finditer(content, pos, endpos):
+            group = match.lastgroup
+            if group == _WORD_GROUP:
+                tag = word_tags.get(match.group())
+            else:
+                tag = group_tags[group]
+            if tag is not None:
+                start, end = match.span()
+                if end > start:
+                    yield (start, end, tag, group) if with_groups else (start, end, tag)
+
+
+# --- Compiled grammar cache ---
+
+# Lexers are compiled lazily, once per language, on first use
+_LEXER_CACHE = {}
+_EXTENSION_MAP = None
+
+
+def get_lexer(lang_name, open_ended=False):
+    """Return the compiled Lexer for a language, building it on first use."""
+    key = (lang_name, open_ended)
+    lexer = _LEXER_CACHE.get(key)
+    if lexer is None:
+        lexer = _LEXER_CACHE[key] = Lexer(LANGUAGES[lang_name], open_ended)
+    return lexer
+
+
+def get_language_for_extension(ext):
+    """Return the language name for a file extension (e.g. '.py'), or None."""
+    global _EXTENSION_MAP
+    if _EXTENSION_MAP is None:
+        _EXTENSION_MAP = {}
+        for lang, data in LANGUAGES.items():
+            for extension in data['extensions']:
+                _EXTENSION_MAP.setdefault(extension, lang)
+    return _EXTENSION_MAP.get(ext.lower())
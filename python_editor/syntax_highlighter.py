@@ -1,12 +1,74 @@
-import re
 import os
-import bisect
+import queue
+import threading
+import time
 import tkinter as tk
-from syntax_definitions import COLORS, LANGUAGES
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from syntax_definitions import COLORS, LANGUAGES, get_lexer, get_language_for_extension
+from language_detector import detect_language
+from token_cache import TokenArrays, TokenCache, content_key
+from profiler import profiler
+
+# Lazy mode: content longer than this is only tagged around the viewport
+LAZY_MIN_LINES = 1500
+# Extra lines tagged above and below the visible area
+LAZY_MARGIN_LINES = 100
+# Maximum number of index pairs passed to a single tag_add call
+TAG_BATCH_SIZE = 20000
+# Content at least this long is lexed off the Tk thread (in a process above PROCESS_MIN_CHARS)
+BACKGROUND_MIN_CHARS = 100000
+PROCESS_MIN_CHARS = 1000000
+# Tokens per batch sent by the worker, and Tk time spent applying them per slice
+TOKEN_BATCH_TOKENS = 2000
+APPLY_SLICE_MS = 8
+POLL_MS = 16
+
+_process_pool = None
+
+
+def compute_line_offsets(content):
+    """Offset of the start of every line, plus the length of content at the end."""
+    line_offsets = [0]
+    for line in content.splitlines(keepends=True):
+        line_offsets.append(line_offsets[-1] + len(line))
+    return line_offsets
+
+
+def tokenize_to_arrays(lang_name, content):
+    """Lex content into TokenArrays. Top-level so it can run in a worker process."""
+    return TokenArrays(get_lexer(lang_name).tokenize(content), compute_line_offsets(content))
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=1)
+    return _process_pool
+
 
 class SyntaxHighlighter:
-    def __init__(self, text_widget):
+    def __init__(self, text_widget, lazy=False, token_cache=None):
         self.text_widget = text_widget
+        # CTkTextbox wraps a tk.Text; scroll hooks need the real widget
+        self._text = getattr(text_widget, '_textbox', text_widget)
+        self.lazy = lazy
+        # Tokens of recently shown code, so showing it again only replays tags
+        self.token_cache = token_cache if token_cache is not None else TokenCache()
+        self._lazy_content = None
+        self._lazy_lexer = None
+        self._lazy_line_offsets = None
+        self._lazy_tokens = None  # TokenArrays of the lazy content when cached
+        self._lazy_key = None
+        self._lazy_prefix = None  # Otherwise, tokens lexed so far from the start of the content
+        self._lazy_lex_pos = 0  # Offset where lexing of the prefix resumes
+        self._lazy_shown = 0  # Characters of the lazy content present in the widget
+        self._tagged_ranges = []  # Sorted, merged (start_line, end_line) already tagged
+        self._hooks_installed = False
+        self._visible_pending = False
+        self._generation = 0  # Bumped by every highlight(); stale background work checks it
+        self._tag_add_calls = 0  # Running count of tag_add calls, for the profiler spans
         self.configure_tags()
 
     def configure_tags(self):
@@ -17,147 +79,326 @@ class SyntaxHighlighter:
     def get_language_from_extension(self, file_path):
         """Determine the language based on the file extension."""
         _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
-        
-        for lang, data in LANGUAGES.items():
-            if ext in data['extensions']:
-                return lang, data
-        return None, None
-
-    def highlight(self, content, file_path=""):
-        """Apply syntax highlighting to the text widget."""
+        lang = get_language_for_extension(ext)
+        if lang is None:
+            return None, None
+        return lang, LANGUAGES[lang]
+
+    def cancel(self):
+        """Drop pending background highlighting and lazy state, e.g. before replacing the text."""
+        self._generation += 1
+        self._lazy_content = None
+        self._lazy_tokens = None
+        self._lazy_prefix = None
+
+    def get_language(self, file_path="", content=None):
+        """Language from the file extension or, failing that, guessed from the start of content."""
+        lang = detect_language(file_path, content)
+        if lang is None:
+            return None, None
+        return lang, LANGUAGES[lang]
+
+    def highlight(self, content, file_path="", lang_name=None, shown_chars=None):
+        """
+        Apply syntax highlighting to the text widget. lang_name overrides the
+        detection from file_path and content. Long uncached content is
+        lexed in a background worker and tagged in time slices, so this returns
+        right away and the plain text stays responsive.
+        shown_chars says that the widget only holds content[:shown_chars] so
+        far: the content is then highlighted in lazy mode and show_more()
+        extends it as more text is inserted, without lexing anything again.
+        """
+        if not profiler.enabled:
+            self._highlight(content, file_path, lang_name, shown_chars)
+            return
+        with profiler.span("highlight") as span:
+            calls = self._tag_add_calls
+            self._highlight(content, file_path, lang_name, shown_chars)
+            span.set(chars=len(content), tag_add_calls=self._tag_add_calls - calls)
+
+    def show_more(self, shown_chars):
+        """The widget now holds content[:shown_chars] of the last highlight(): tag what became visible."""
+        if self._lazy_content is None or shown_chars <= self._lazy_shown:
+            return
+        self._lazy_shown = min(shown_chars, len(self._lazy_content))
+        self._highlight_visible()
+
+    def _highlight(self, content, file_path, lang_name, shown_chars=None):
+        """Body of highlight."""
+        self._generation += 1
         # Remove existing tags
         for tag in COLORS.keys():
             self.text_widget.tag_remove(tag, "1.0", "end")
+        self._lazy_content = None
 
-        lang_name, lang_data = self.get_language_from_extension(file_path)
+        if lang_name is None:
+            lang_name, lang_data = self.get_language(file_path, content)
+        else:
+            lang_data = LANGUAGES.get(lang_name)
         if not lang_data:
             return
 
-        # self.text_widget.get("1.0", "end") matches 'content' usually, 
-        # but we iterate over patterns and find matches in 'content' string
-        # then map those matches to line.col in the text widget.
-        
-        # Helper to apply tag to a match object
-        def apply_tag(tag, match):
-            start = match.start()
-            end = match.end()
-            # Convert string index to tkinter 'line.col'
-            # Note: This is computationally expensive for large files if done naively.
-            # A better approach for Tkinter is to search line by line or use built-in search.
-            # However, since we have the full content string, let's map indices.
-            
-            # Optimization: 
-            # Tkinter text indices are "line_num.char_index" (1-based lines, 0-based chars)
-            # We can calculate this from the content string if we know line breaks.
-            pass
-
-        # To avoid index mapping complexity and performance issues with mapping absolute indices 
-        # to row.col, we will process line by line or using Tkinter's built-in search?
-        # Using Tkinter's search for regex is possible but limited (Tcl regexp).
-        # Python's re is more powerful. 
-        
-        # Strategy:
-        # 1. Iterate over all regex patterns in the language definition.
-        # 2. Find all matches in the content string.
-        # 3. Convert match start/end to Tkinter indices.
-        # 4. Apply tags.
-        
-        # Pre-calculate cumulative line lengths to quickly map index -> line.col
-        lines = content.splitlines(keepends=True)
-        line_offsets = [0]
-        for line in lines:
-            line_offsets.append(line_offsets[-1] + len(line))
-            
-        def get_index(offset):
-            # Binary search could be used here but linear scan is okay for now or using bisect
-            import bisect
-            line_idx = bisect.bisect_right(line_offsets, offset) - 1
-            col_idx = offset - line_offsets[line_idx]
-            return f"{line_idx + 1}.{col_idx}"
-
-        # Order of application matters: 
-        # generally comments and strings should override keywords.
-        # So we apply keywords first, then others, OR use priority.
-        # But `tag_add` just adds a tag, multiple tags can exist.
-        # `tag_raise` can preserve precedence.
-        
-        # Let's apply in this order:
-        # 1. Keywords / Builtins / Constants (Matches whole words usually)
-        # 2. Regex patterns (Numbers, Decorators, etc)
-        # 3. Strings
-        # 4. Comments (Highest priority usually covers everything inside)
-        
-        # 1. Word-based highlighting (Keywords, Builtins, Constants, Types, etc)
-        word_categories = {
-            'keyword': lang_data.get('keywords', []),
-            'constant': lang_data.get('constants', []),
-            'builtin': lang_data.get('builtins', []), # Map to 'function' or 'support'
-            'type': lang_data.get('types', []),
-            'function': [], # Hard to match exact function defs with just lists, regex pref.
-            'self_args': lang_data.get('self_args', []),
-            'sql_function': lang_data.get('functions', []), # For SQL
-            'boolean': lang_data.get('constants', []), # reused
-        }
-        
-        # Pre-compile word patterns for performance
-        # \b(word1|word2|...)\b
-        for category, words in word_categories.items():
-            if not words: continue
-            
-            # Map category to specific color tag
-            color_tag = category
-            if category == 'builtin': color_tag = 'function' # approximate
-            if category == 'self_args': color_tag = 'variable'
-            if category == 'sql_function': color_tag = 'function'
-            if category not in COLORS and color_tag not in COLORS: color_tag = 'keyword' # fallback
-
-            escaped_words = [re.escape(w) for w in words]
-            pattern = r'\b(' + '|'.join(escaped_words) + r')\b'
-            
-            for match in re.finditer(pattern, content):
-                 start_idx = get_index(match.start())
-                 end_idx = get_index(match.end())
-                 self.text_widget.tag_add(color_tag, start_idx, end_idx)
-
-        # 2. Regex-based patterns (defined in LANGUAGES)
-        # Categories that are lists of regex strings:
-        regex_categories = [
-            ('comment', lang_data.get('comments', [])),
-            ('string', lang_data.get('strings', [])),
-            ('number', lang_data.get('numbers', [])),
-            ('decorator', lang_data.get('decorators', [])),
-            ('preprocessor', lang_data.get('preprocessor', [])), # maps to keyword/control usually
-            ('variable', lang_data.get('variables', [])), # PHP/Ruby vars
-            ('tag', lang_data.get('tags', [])), # HTML
-            ('attribute', lang_data.get('attributes', [])), # HTML
-            ('selector', lang_data.get('selectors', [])), # CSS
-            ('property', lang_data.get('properties', [])), # CSS
-            ('header', lang_data.get('headers', [])), # MD
-            ('bold', lang_data.get('bold', [])), # MD
-            ('code', lang_data.get('code', [])), # MD
-            ('link', lang_data.get('links', [])), # MD
-            ('key', lang_data.get('keys', [])), # YAML/JSON
-        ]
-
-        for tag_name, patterns in regex_categories:
-            if not patterns: continue
-            
-            final_tag = tag_name
-            if tag_name == 'preprocessor': final_tag = 'keyword'
-            if tag_name == 'header': final_tag = 'constant' # Distinct color
-            if tag_name == 'link': final_tag = 'string'
-            if tag_name == 'key': final_tag = 'variable'
-            
-            for pat in patterns:
+        key = content_key(lang_name, content)
+        cached = self.token_cache.get(key)
+        background = cached is None and len(content) >= BACKGROUND_MIN_CHARS
+
+        # Compiled once per language and cached in syntax_definitions
+        lexer = get_lexer(lang_name)
+
+        partial = shown_chars is not None and shown_chars < len(content)
+        if partial or (self.lazy and content.count("\n") > LAZY_MIN_LINES):
+            # Big content: only tag what is on screen, extend on scroll/resize
+            self._lazy_content = content
+            self._lazy_shown = shown_chars if partial else len(content)
+            self._lazy_lexer = lexer
+            self._lazy_line_offsets = cached.line_offsets if cached is not None else compute_line_offsets(content)
+            self._lazy_tokens = cached
+            self._lazy_key = key
+            self._lazy_prefix = TokenArrays((), self._lazy_line_offsets) if cached is None else None
+            self._lazy_lex_pos = 0
+            self._tagged_ranges = []
+            self._install_scroll_hooks()
+            self._highlight_visible()
+            if background:
+                # Fill the cache meanwhile; later scrolling replays it instead of lexing
+                self._tokenize_in_background(key, lang_name, content, apply=False)
+            return
+
+        if background:
+            self._tokenize_in_background(key, lang_name, content, apply=True)
+            return
+        if cached is None:
+            cached = TokenArrays(lexer.tokenize(content), compute_line_offsets(content))
+            self.token_cache.put(key, cached)
+        self._apply_tokens(cached.iter_tokens(), cached.line_offsets)
+
+    def _tokenize_in_background(self, key, lang_name, content, apply):
+        """
+        Lex content in a worker and, if apply is set, tag the token batches from
+        the Tk loop in slices of APPLY_SLICE_MS. A newer highlight() call
+        cancels the work: the thread stops and pending batches are dropped.
+        """
+        generation = self._generation
+        messages = queue.Queue()
+
+        def is_stale():
+            return generation != self._generation
+
+        def worker():
+            try:
+                if len(content) >= PROCESS_MIN_CHARS:
+                    # Very large input: a process does not compete with Tk for the GIL
+                    messages.put(("done", _get_process_pool().submit(tokenize_to_arrays, lang_name, content).result()))
+                    return
+                line_offsets = compute_line_offsets(content)
+                messages.put(("offsets", line_offsets))
+                tokens = []
+                batch_start = 0
+                for token in get_lexer(lang_name).tokenize(content):
+                    tokens.append(token)
+                    if len(tokens) - batch_start >= TOKEN_BATCH_TOKENS:
+                        if is_stale():
+                            return
+                        messages.put(("batch", tokens[batch_start:]))
+                        batch_start = len(tokens)
+                messages.put(("batch", tokens[batch_start:]))
+                messages.put(("done", TokenArrays(tokens, line_offsets)))
+            except Exception as e:
+                messages.put(("error", e))
+
+        pending = deque()  # Batches received but not applied yet
+        state = {"line_offsets": None, "done": False}
+
+        def poll():
+            if is_stale():
+                return
+            deadline = time.perf_counter() + APPLY_SLICE_MS / 1000
+            while True:
+                if pending and apply:
+                    self._apply_tokens(pending.popleft(), state["line_offsets"])
+                    if time.perf_counter() >= deadline:
+                        break
+                    continue
                 try:
-                    for match in re.finditer(pat, content, re.MULTILINE):
-                        start_idx = get_index(match.start())
-                        end_idx = get_index(match.end())
-                        self.text_widget.tag_add(final_tag, start_idx, end_idx)
-                except re.error:
-                    pass
-
-        # Ensure comments and strings are on top
-        self.text_widget.tag_raise('string')
-        self.text_widget.tag_raise('comment')
+                    kind, payload = messages.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "offsets":
+                    state["line_offsets"] = payload
+                elif kind == "batch":
+                    pending.append(payload)
+                elif kind == "done":
+                    state["done"] = True
+                    self.token_cache.put(key, payload)
+                    if self._lazy_content is content:
+                        self._lazy_tokens = payload
+                        self._lazy_prefix = None
+                    if apply and state["line_offsets"] is None:
+                        # Result of the process: replay it in batches
+                        state["line_offsets"] = payload.line_offsets
+                        for start in range(0, len(payload), TOKEN_BATCH_TOKENS):
+                            pending.append(payload.iter_range(start, start + TOKEN_BATCH_TOKENS))
+                elif kind == "error":
+                    print(f"Error highlighting in background: {payload}")
+                    return
+            if pending and apply:
+                self._text.after(1, poll)
+            elif not state["done"]:
+                self._text.after(POLL_MS, poll)
+
+        threading.Thread(target=worker, daemon=True).start()
+        self._text.after(POLL_MS, poll)
+
+    def _install_scroll_hooks(self):
+        """Chain our handler after the widget's yscrollcommand and on <Configure>."""
+        if self._hooks_installed:
+            return
+        self._hooks_installed = True
+        previous = self._text.cget("yscrollcommand")
+
+        def on_yscroll(first, last):
+            if previous:
+                self._text.tk.eval(f"{previous} {first} {last}")
+            self._schedule_visible()
+
+        self._text.configure(yscrollcommand=on_yscroll)
+        self._text.bind("<Configure>", lambda event: self._schedule_visible(), add="+")
+
+    def _schedule_visible(self):
+        if self._lazy_content is None or self._visible_pending:
+            return
+        self._visible_pending = True
+        self._text.after_idle(self._highlight_visible)
+
+    def _highlight_visible(self):
+        """Tag the visible lines plus a margin, skipping ranges that are already tagged."""
+        self._visible_pending = False
+        if self._lazy_content is None:
+            return
+
+        line_offsets = self._lazy_line_offsets
+        shown = self._lazy_shown
+        # Lines present in the widget; the last one may be cut at shown
+        total_lines = bisect_left(line_offsets, shown)
+        first_visible = int(self._text.index("@0,0").split(".")[0])
+        last_visible = int(self._text.index(f"@0,{self._text.winfo_height()}").split(".")[0])
+        start = max(1, first_visible - LAZY_MARGIN_LINES)
+        end = min(total_lines, last_visible + LAZY_MARGIN_LINES)
+
+        for gap_start, gap_end in self._untagged_gaps(start, end):
+            base = line_offsets[gap_start - 1]
+            # A gap can start inside a multi-line string or comment, so it is never
+            # lexed on its own: replay the slice from the tokens of the whole content
+            tokens = self._lazy_tokens
+            if tokens is None:  # An empty TokenArrays is falsy but complete
+                tokens = self._lex_prefix(line_offsets[gap_end])
+            gap_end_offset = min(line_offsets[gap_end], shown)
+            # One line more than the gap: a token ending on the last newline ends at 'next.0',
+            # not at a column past the line end that Tk would clamp before the newline
+            gap_offsets = [offset - base for offset in line_offsets[gap_start - 1:gap_end + 2]]
+            gap_tokens = ((s - base, e - base, tag) for s, e, tag in tokens.iter_tokens(base, gap_end_offset))
+            self._apply_tokens(gap_tokens, gap_offsets, first_line=gap_start)
+            if line_offsets[gap_end] > shown:
+                gap_end -= 1  # Cut line: tagged again whole once show_more() completes it
+            if gap_end >= gap_start:
+                self._mark_tagged(gap_start, gap_end)
+
+    def _lex_prefix(self, offset):
+        """
+        Lex the lazy content from where the previous call stopped until past
+        offset, so the scanner state carries over from the start of the content.
+        Returns the prefix TokenArrays; once it covers the whole content it is
+        cached like the result of a full highlight(), and returned from then on.
+        """
+        if self._lazy_tokens is not None:
+            return self._lazy_tokens
+        prefix = self._lazy_prefix
+        if self._lazy_lex_pos < offset:
+            content = self._lazy_content
+            tokens = []
+            pos = len(content)
+            for token in self._lazy_lexer.tokenize(content, self._lazy_lex_pos):
+                tokens.append(token)
+                if token[1] >= offset:
+                    pos = token[1]
+                    break
+            prefix.extend(tokens)
+            self._lazy_lex_pos = pos
+            if pos >= len(content):
+                self.token_cache.put(self._lazy_key, prefix)
+                self._lazy_tokens, self._lazy_prefix = prefix, None
+        return prefix
+
+    def _untagged_gaps(self, start, end):
+        """Parts of the line range [start, end] not covered by self._tagged_ranges."""
+        gaps = []
+        cursor = start
+        for tagged_start, tagged_end in self._tagged_ranges:
+            if tagged_end < cursor:
+                continue
+            if tagged_start > end:
+                break
+            if tagged_start > cursor:
+                gaps.append((cursor, tagged_start - 1))
+            cursor = max(cursor, tagged_end + 1)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _mark_tagged(self, start, end):
+        """Insert [start, end] into the sorted list of tagged line ranges, merging neighbours."""
+        merged = []
+        for tagged_start, tagged_end in self._tagged_ranges:
+            if tagged_end + 1 < start or tagged_start > end + 1:
+                merged.append((tagged_start, tagged_end))
+            else:
+                start, end = min(start, tagged_start), max(end, tagged_end)
+        merged.append((start, end))
+        merged.sort()
+        self._tagged_ranges = merged
+
+    def _apply_tokens(self, tokens, line_offsets, first_line=1):
+        """Tag tokens (see _apply_token_ranges), timed as the highlight_apply span."""
+        if not profiler.enabled:
+            self._apply_token_ranges(tokens, line_offsets, first_line)
+            return
+        with profiler.span("highlight_apply") as span:
+            range_count, calls = self._apply_token_ranges(tokens, line_offsets, first_line)
+            span.set(ranges=range_count, tag_add_calls=calls)
+
+    def _apply_token_ranges(self, tokens, line_offsets, first_line):
+        """
+        Add tags in bulk: ranges are grouped per tag, adjacent ranges merged, and
+        each tag gets one multi-range tag_add call instead of one call per token.
+        Tokens arrive sorted, so offsets are mapped to 'line.col' with a single
+        forward sweep over line_offsets instead of a binary search per index.
+        Returns (ranges tagged, tag_add calls issued).
+        """
+        ranges = {}      # tag -> flat list of offsets [start, end, start, end, ...]
+        for start, end, tag in tokens:
+            tag_ranges = ranges.get(tag)
+            if tag_ranges is None:
+                ranges[tag] = [start, end]
+            elif tag_ranges[-1] == start:
+                tag_ranges[-1] = end  # Adjacent to the previous range: merge
+            else:
+                tag_ranges.append(start)
+                tag_ranges.append(end)
+
+        last_line = len(line_offsets) - 2
+        range_count = calls = 0
+        for tag, offsets in ranges.items():
+            indices = []
+            # Batches may start far down the content: find the first line once
+            line_idx = max(0, min(last_line, bisect_right(line_offsets, offsets[0]) - 1))
+            # Starts and ends of one tag are non-decreasing, so the cursor only moves forward
+            for offset in offsets:
+                while line_idx < last_line and line_offsets[line_idx + 1] <= offset:
+                    line_idx += 1
+                indices.append(f"{line_idx + first_line}.{offset - line_offsets[line_idx]}")
+            for chunk_start in range(0, len(indices), TAG_BATCH_SIZE):
+                self._text.tag_add(tag, *indices[chunk_start:chunk_start + TAG_BATCH_SIZE])
+                calls += 1
+            range_count += len(offsets) // 2
+        self._tag_add_calls += calls
+        return range_count, calls
@@ -0,0 +1,97 @@
+import hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+# Default limits of the highlighter token cache
+TOKEN_CACHE_MAX_ENTRIES = 64
+TOKEN_CACHE_MAX_TOKENS = 2000000
+
+
+def content_key(lang_name, content):
+    """Cache key of a piece of code: its language plus a hash of the text."""
+    digest = hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    return (lang_name, digest)
+
+
+class TokenArrays:
+    """
+    Tokens of one text as parallel compact arrays (start, end, tag id) plus
+    the line start offsets, about 13 bytes per token instead of a tuple each.
+    """
+    __slots__ = ("starts", "ends", "tag_ids", "tags", "line_offsets")
+
+    def __init__(self, tokens, line_offsets):
+        self.starts = array("I")
+        self.ends = array("I")
+        self.tag_ids = array("B")
+        self.tags = []
+        self.line_offsets = array("I", line_offsets)
+        self.extend(tokens)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def extend(self, tokens):
+        """Append (start, end, tag) tokens that follow the ones already stored."""
+        tag_index = {tag: tag_id for tag_id, tag in enumerate(self.tags)}
+        for start, end, tag in tokens:
+            tag_id = tag_index.get(tag)
+            if tag_id is None:
+                tag_id = tag_index[tag] = len(self.tags)
+                self.tags.append(tag)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.tag_ids.append(tag_id)
+
+    def iter_tokens(self, start_offset=0, end_offset=None):
+        """Yield (start, end, tag) for the tokens overlapping [start_offset, end_offset), clipped to it."""
+        if end_offset is None:
+            yield from self.iter_range(0, len(self.starts))
+            return
+        # Tokens do not overlap, so ends are sorted as well
+        first = bisect_right(self.ends, start_offset)
+        last = bisect_left(self.starts, end_offset)
+        for start, end, tag in self.iter_range(first, last):
+            yield max(start, start_offset), min(end, end_offset), tag
+
+    def iter_range(self, first, last):
+        """Yield (start, end, tag) for the tokens with index in [first, last)."""
+        starts, ends, tag_ids, tags = self.starts, self.ends, self.tag_ids, self.tags
+        for i in range(first, min(last, len(starts))):
+            yield starts[i], ends[i], tags[tag_ids[i]]
+
+
+class TokenCache:
+    """LRU cache of TokenArrays keyed by content_key(), bounded by entries and total tokens."""
+
+    def __init__(self, max_entries=TOKEN_CACHE_MAX_ENTRIES, max_tokens=TOKEN_CACHE_MAX_TOKENS):
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self._entries = OrderedDict()
+        self._token_count = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if len(entry) > self.max_tokens:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._token_count -= len(previous)
+        self._entries[key] = entry
+        self._token_count += len(entry)
+        while len(self._entries) > self.max_entries or self._token_count > self.max_tokens:
+            _, evicted = self._entries.popitem(last=False)
+            self._token_count -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._token_count = 0
@@ -0,0 +1,104 @@
+"""
+Flattened tree of compound assets for the sub-assets panel.
+The visible rows (expanded nodes and their children) are kept as one flat
+list of TreeNode. Expanding or collapsing a node splices its subtree's rows
+in or out at the node's index instead of rebuilding the whole list, and the
+model is a VirtualList data source, so the list keeps its scroll position.
+"""
+
+
+class TreeNode:
+    """Wrapper for assets to display in tree with depth and expansion state."""
+    def __init__(self, asset, depth=0, is_expanded=False):
+        self.asset = asset
+        self.depth = depth
+        self.is_expanded = is_expanded
+        self.is_compound = getattr(asset, 'asset_type', '') == 'Compound'
+        # Use original asset name without modification for consistent display
+        self.name = asset.name if hasattr(asset, 'name') else str(asset)
+        self.asset_type = getattr(asset, 'asset_type', 'default')
+        # Copy other relevant properties from asset for consistent rendering
+        self.file_path = getattr(asset, 'file_path', '')
+        self.line_number = getattr(asset, 'line_number', 0)
+
+    def __repr__(self):
+        return self.name
+
+
+class TreeModel:
+    """
+    Visible rows of the tree under root. expanded is the set of id(asset) of
+    the expanded compound assets; it is shared with the caller and updated by
+    toggle().
+    """
+    def __init__(self, root, expanded=None):
+        self.root = root
+        self.expanded = expanded if expanded is not None else set()
+        self.nodes = self.flatten(root, 0)
+
+    def flatten(self, asset, depth):
+        """Rows of the expanded subtree under asset, children at the given depth."""
+        nodes = []
+        # Explicit stack instead of recursion: deep compound chains are fine
+        stack = [(iter(getattr(asset, 'children', [])), depth)]
+        while stack:
+            children, level = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            is_expanded = getattr(child, 'asset_type', '') == 'Compound' and id(child) in self.expanded
+            nodes.append(TreeNode(child, level, is_expanded))
+            if is_expanded:
+                stack.append((iter(getattr(child, 'children', [])), level + 1))
+        return nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, idx):
+        return self.nodes[idx]
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def get_range(self, start, end):
+        return self.nodes[start:end]
+
+    def index_of(self, node, hint=-1):
+        """Row of node; hint is checked first (e.g. the row that was just clicked)."""
+        if 0 <= hint < len(self.nodes) and self.nodes[hint] is node:
+            return hint
+        for idx, candidate in enumerate(self.nodes):
+            if candidate is node:
+                return idx
+        return -1
+
+    def subtree_size(self, idx):
+        """Number of rows under row idx (its visible descendants)."""
+        depth = self.nodes[idx].depth
+        end = idx + 1
+        while end < len(self.nodes) and self.nodes[end].depth > depth:
+            end += 1
+        return end - idx - 1
+
+    def toggle(self, idx):
+        """
+        Expand or collapse the compound node at row idx.
+        Returns (first_row, inserted, removed): the rows that appeared or went
+        away start at first_row. The cost is the number of those rows.
+        """
+        node = self.nodes[idx]
+        if not node.is_compound:
+            return idx + 1, 0, 0
+        if node.is_expanded:
+            removed = self.subtree_size(idx)
+            del self.nodes[idx + 1:idx + 1 + removed]
+            node.is_expanded = False
+            self.expanded.discard(id(node.asset))
+            return idx + 1, 0, removed
+        node.is_expanded = True
+        self.expanded.add(id(node.asset))
+        rows = self.flatten(node.asset, node.depth + 1)
+        self.nodes[idx + 1:idx + 1] = rows
+        return idx + 1, len(rows), 0
@@ -0,0 +1,191 @@
+"""
+Benchmark and regression suite of VirtualList, headless.
+Drives VirtualListCore on a RecordingCanvas for lists of 1k to 1M items and
+reports the cost of set_data, a redraw from scratch, a redraw with nothing
+to change, a wheel scroll step and a jump (time and canvas calls), hit
+testing, and the memory taken by the list without the items. --variable
+gives every row its own height (Fenwick tree layout), --lazy serves the
+rows from a PagedDataSource instead of a list.
+
+Usage: python virtual_list_benchmark.py [--sizes 1000,10000,100000,1000000] [--steps N]
+           [--variable] [--lazy] [--save-baseline FILE] [--baseline FILE] [--threshold 0.25]
+Exit status is 1 when a measure is worse than the baseline beyond the threshold.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from data_source import PagedDataSource
+from recording_canvas import RecordingCanvas, RecordingEvent
+from virtual_list_core import VirtualListCore
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_THRESHOLD = 0.25
+ASSET_TYPES = ('Function', 'Class', 'Variable', 'Region', 'Compound')
+# Measures compared with the baseline (lower is better)
+COMPARED = ('scroll_ms', 'scroll_calls', 'jump_ms', 'jump_calls', 'redraw_ms', 'idle_ms', 'hit_us')
+
+
+class BenchItem:
+    __slots__ = ('name', 'asset_type', 'file_path', 'line_number', 'depth')
+
+    def __init__(self, i):
+        self.name = f"item_{i}"
+        self.asset_type = ASSET_TYPES[i % len(ASSET_TYPES)]
+        self.file_path = f"src/module_{i // 1000}.py"
+        self.line_number = i % 1000 + 1
+        self.depth = i % 3
+
+
+def make_items(count):
+    return [BenchItem(i) for i in range(count)]
+
+
+def make_list(canvas, variable):
+    row_height = (lambda item: 40 + (item.line_number % 4) * 10) if variable else None
+    return VirtualListCore(canvas, item_height=50, row_height=row_height)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def measure(count, steps, variable=False, lazy=False, seed=1234):
+    """Run every measure on a list of count items; returns a dict of results."""
+    rng = random.Random(seed)
+    canvas = RecordingCanvas()
+
+    items = make_items(count)
+
+    def make_data():
+        if lazy:
+            return PagedDataSource(count, lambda offset, limit: items[offset:offset + limit])
+        return items
+
+    vlist = make_list(canvas, variable)
+    data = make_data()
+    set_data_s = timed(lambda: (vlist.set_data(data), canvas.pump()))
+
+    # Memory of the list itself (layout, window, pool), not of the items: the
+    # same set_data again on a fresh list, traced apart since tracing slows it down
+    tracemalloc.start()
+    memory_canvas = RecordingCanvas()
+    memory_list = make_list(memory_canvas, variable)
+    memory_list.set_data(make_data())
+    memory_canvas.pump()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del memory_list, memory_canvas
+
+    # Redraw from scratch: every visible row rewritten
+    canvas.reset_counters()
+    vlist._invalidate_rows()
+    redraw_s = timed(vlist._redraw)
+    redraw_calls = canvas.calls
+
+    # Redraw with nothing to change
+    canvas.reset_counters()
+    idle_s = timed(vlist._redraw)
+    idle_calls = canvas.calls
+
+    # Wheel steps down (one notch each), each applied by its frame
+    canvas.reset_counters()
+    wheel = RecordingEvent(num=5)
+
+    def scroll():
+        for _ in range(steps):
+            canvas.fire("<Button-5>", wheel)
+            canvas.pump()
+    scroll_s = timed(scroll)
+    scroll_calls = canvas.calls
+
+    # Jumps to random positions (scrollbar drags)
+    canvas.reset_counters()
+    total = vlist.total_height
+
+    def jump():
+        for _ in range(steps):
+            canvas.yview_moveto(rng.random())
+            vlist._redraw()
+    jump_s = timed(jump)
+    jump_calls = canvas.calls - steps  # Without the yview calls made here
+
+    # Hit testing at random heights
+    ys = [rng.random() * total for _ in range(10000)]
+    hit_s = timed(lambda: [vlist.layout.index_at(y) for y in ys])
+
+    return {
+        'items': count,
+        'set_data_ms': set_data_s * 1000,
+        'list_kb': peak / 1024,
+        'redraw_ms': redraw_s * 1000,
+        'redraw_calls': redraw_calls,
+        'idle_ms': idle_s * 1000,
+        'idle_calls': idle_calls,
+        'scroll_ms': scroll_s * 1000 / steps,
+        'scroll_calls': scroll_calls / steps,
+        'jump_ms': jump_s * 1000 / steps,
+        'jump_calls': jump_calls / steps,
+        'hit_us': hit_s * 1e6 / len(ys),
+        'canvas_items': len(canvas.items),
+    }
+
+
+def run_suite(args):
+    sizes = [int(size) for size in args.sizes.split(',')] if args.sizes else DEFAULT_SIZES
+    mode = ('variable' if args.variable else 'uniform') + ('/lazy' if args.lazy else '')
+    print(f"mode: {mode}, {args.steps} scroll steps and jumps per size")
+    print(f"{'items':>9}{'set_data ms':>13}{'list KB':>9}{'redraw ms':>11}{'calls':>7}{'idle ms':>9}"
+          f"{'scroll ms':>11}{'calls':>7}{'jump ms':>9}{'calls':>7}{'hit us':>8}{'items':>7}")
+    results = {}
+    for count in sizes:
+        result = measure(count, args.steps, args.variable, args.lazy)
+        results[f"{mode}/{count}"] = result
+        print(f"{count:>9}{result['set_data_ms']:>13.1f}{result['list_kb']:>9.0f}{result['redraw_ms']:>11.2f}"
+              f"{result['redraw_calls']:>7}{result['idle_ms']:>9.3f}{result['scroll_ms']:>11.3f}"
+              f"{result['scroll_calls']:>7.1f}{result['jump_ms']:>9.3f}{result['jump_calls']:>7.1f}"
+              f"{result['hit_us']:>8.2f}{result['canvas_items']:>7}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({name: {key: result[key] for key in COMPARED} for name, result in results.items()}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, result in results.items():
+        for key, expected in baseline.get(name, {}).items():
+            if key in result and expected and result[key] > expected * (1 + args.threshold):
+                regressions.append((name, key, expected, result[key]))
+    if regressions:
+        print(f"\nRegressions (more than {args.threshold:.0%} above baseline):")
+        for name, key, expected, actual in regressions:
+            print(f"  {name:<24}{key:<14}{expected:>10.3f} -> {actual:.3f} ({actual / expected - 1:+.0%})")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', help="comma separated list sizes (default: 1k, 10k, 100k, 1M)")
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--variable', action='store_true', help="rows of different heights")
+    parser.add_argument('--lazy', action='store_true', help="rows from a PagedDataSource")
+    parser.add_argument('--save-baseline', help="write the compared measures to this JSON file")
+    parser.add_argument('--baseline', help="fail if a measure is worse than this JSON baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed increase against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    return run_suite(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
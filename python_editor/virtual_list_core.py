@@ -0,0 +1,766 @@
+"""
+Toolkit-independent part of VirtualList: layout, data window, selection,
+scrolling engine and the pooled redraw. It draws on any object with the
+subset of the tk.Canvas API below, so it runs headless against
+recording_canvas.RecordingCanvas (tests, virtual_list_benchmark.py):
+
+    create_polygon(*coords, **options) / create_text(*coords, **options) -> item id
+    coords(item, *coords), itemconfigure(item, **options)
+    configure(scrollregion=...), canvasy(y), yview(*args), yview_moveto(fraction)
+    winfo_width(), winfo_height(), bind(sequence, handler), focus_set()
+    after(ms, func), after_idle(func), after_cancel(id)
+"""
+import time
+from row_layout import RowLayout
+from data_source import ListDataSource, is_data_source
+from selection_model import RowKeys, SelectionModel
+from profiler import profiler
+
+# Minimum time between two full redraws (one per frame at ~60 fps)
+FRAME_MS = 16
+
+# Pixels per wheel notch (delta 120) or per Button-4/5 event
+WHEEL_STEP_PX = 48
+# Pixels per unit of the small deltas sent by precise touchpads
+FINE_DELTA_PX = 4
+# Kinetic scrolling: velocity kept per frame, and the speed (px/frame) where it stops
+SCROLL_FRICTION = 0.85
+MIN_SCROLL_VELOCITY = 0.5
+
+# Extra height per line of detail text under the row name
+DETAIL_LINE_HEIGHT = 22
+# Rows fetched from the data source above and below the visible ones
+PREFETCH_ROWS = 100
+PLACEHOLDER_COLORS = {'bg': '#333333', 'text': '#777777', 'hover': '#3A3A3A'}
+# Border of the keyboard cursor row
+FOCUS_BORDER_COLOR = '#90CAF9'
+# Rounded rectangle templates kept per list before the cache is reset (resizes create new widths)
+MAX_SHAPE_TEMPLATES = 256
+
+# Drawn state of a pool slot whose items may show anything (after set_data or a pool resize)
+_STALE = object()
+
+
+class VirtualListCore:
+    """
+    List logic over a canvas (see the module docstring for the calls it
+    makes). font is passed to the row text items as is.
+    """
+    def __init__(self, canvas, item_height=50, use_checkboxes=False, command_click=None, command_double_click=None,
+                 row_height=None, detail_text=None, key_func=None, kinetic=False, font=None):
+        self.canvas = canvas
+        self.data = ListDataSource()
+        self.item_height = item_height
+        self.row_height = row_height
+        self.detail_text = detail_text
+        self.layout = RowLayout(0, item_height)  # Row offsets (prefix sums of the heights)
+        self.use_checkboxes = use_checkboxes
+        self.command_click = command_click
+        self.command_double_click = command_double_click
+        # Keys of this list's rows unless key_func gives them
+        self.row_keys = RowKeys() if key_func is None else None
+        self.key_func = key_func or self.row_keys.key
+        self.selection = SelectionModel()
+        self.focus_index = -1  # Keyboard cursor row
+        self.kinetic = kinetic
+        self.total_height = 0
+        self.last_clicked_item = None
+        
+        # Colors for different asset types
+        self.type_colors = {
+            'Function': {'bg': '#E3F2FD', 'text': '#0D47A1', 'hover': '#BBDEFB'},
+            'Class': {'bg': '#FFEBEE', 'text': '#B71C1C', 'hover': '#FFCDD2'},
+            'Region': {'bg': '#FFF3E0', 'text': '#E65100', 'hover': '#FFE0B2'},
+            'Component': {'bg': '#E8F5E9', 'text': '#1B5E20', 'hover': '#C8E6C9'},
+            'Variable': {'bg': '#FCE4EC', 'text': '#880E4F', 'hover': '#F8BBD0'},
+            'Constant': {'bg': '#FCE4EC', 'text': '#880E4F', 'hover': '#F8BBD0'},
+            'Compound': {'bg': '#E0F2F1', 'text': '#00695C', 'hover': '#B2DFDB'},
+            'default': {'bg': '#3D3D3D', 'text': '#FFFFFF', 'hover': '#4D4D4D'}
+        }
+        
+        # State
+        self.hover_index = -1
+        self._needs_redraw = False  # A full redraw is requested for the next frame
+        self._redraw_scheduled = False
+        self._last_frame_time = 0.0
+        self._dirty_rows = set()  # Rows to repaint on the hover fast path
+        self._rows_scheduled = False
+        
+        # Scrolling engine: wheel pixels not applied yet, glide speed and its single timer
+        self._scroll_pending = 0.0
+        self._scroll_velocity = 0.0
+        self._scroll_timer = None
+        
+        # Row item pool: canvas items are created once and reused. Row idx is drawn
+        # by slot idx % len(pool), so after a scroll only rows entering the view change
+        self._pool = []  # [polygon_id, text_id, drawn state | None (hidden) | _STALE] per slot
+        self._visible_range = (0, 0)
+        
+        # Rows fetched from the data source: items of [_window_start, _window_start + len(_window))
+        self._window_start = 0
+        self._window = []
+        
+        # Precomputed drawing data: rounded rectangle points per (x_left, x_right, height)
+        # relative to the row top, and colors per (asset_type, hovered, selected)
+        self._shape_templates = {}
+        self._color_cache = {}
+        self.row_font = font
+
+        self._bind_canvas_events()
+
+    def _bind_canvas_events(self):
+        """Route the canvas events to the handlers below."""
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", self._on_mousewheel)  # Linux
+        self.canvas.bind("<Button-5>", self._on_mousewheel)  # Linux
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.canvas.bind("<Leave>", self._on_leave)
+        self.canvas.bind("<Up>", lambda e: self.move_focus(-1, e))
+        self.canvas.bind("<Down>", lambda e: self.move_focus(1, e))
+        self.canvas.bind("<Prior>", lambda e: self.move_focus(-self._rows_per_page(), e))
+        self.canvas.bind("<Next>", lambda e: self.move_focus(self._rows_per_page(), e))
+        self.canvas.bind("<Home>", lambda e: self.set_focus_index(0, e))
+        self.canvas.bind("<End>", lambda e: self.set_focus_index(len(self.data) - 1, e))
+        self.canvas.bind("<Return>", self._on_activate)
+        self.canvas.bind("<space>", self._on_space)
+        self.canvas.bind("<Control-a>", self._on_select_all)
+
+    def set_data(self, data):
+        """Set the data to display in the list: a list or a data source."""
+        if is_data_source(data):
+            self.data = data
+        else:
+            self.data = ListDataSource(data if data else [])
+        if self.row_keys is not None and self.selection.empty:
+            # Nothing selected refers to the old keys: start the table over for the new rows
+            self.row_keys.clear()
+            self.selection.clear()
+        self._window_start, self._window = 0, []
+        self._invalidate_rows()
+        heights = None
+        if (self.row_height is not None or self.detail_text is not None) and isinstance(self.data, ListDataSource):
+            # Materialized list: measure every row now. Lazy sources are measured as rows are fetched
+            heights = [self._get_row_height(item) for item in self.data.items]
+        self.layout.reset(len(self.data), self.item_height, heights)
+        if self.focus_index >= len(self.data):
+            self.focus_index = -1
+        self._update_scrollregion()
+        self.canvas.yview_moveto(0)
+        self.request_redraw()
+
+    def notify_rows_changed(self, start=0, end=None):
+        """
+        Rows [start, end) of the data source changed or finished loading (call from
+        the Tk thread). A different row count re-lays out the list keeping the scroll.
+        """
+        if len(self.data) != len(self.layout):
+            self.layout.reset(len(self.data), self.item_height)
+            self._update_scrollregion()
+            self._window_start, self._window = 0, []
+        else:
+            window_end = self._window_start + len(self._window)
+            if end is None or (start < window_end and end > self._window_start):
+                self._window_start, self._window = 0, []
+        self._invalidate_rows()
+        self.request_redraw()
+
+    def notify_rows_inserted(self, idx, count):
+        """count rows were inserted into the data source before row idx (e.g. a tree node expanded)."""
+        if count <= 0:
+            return
+        heights = None
+        if self.row_height is not None or self.detail_text is not None:
+            heights = [self._get_row_height(item) for item in self.data.get_range(idx, idx + count)]
+        self.layout.insert(idx, count, heights)
+        self._shift_rows(idx, count)
+
+    def notify_rows_removed(self, idx, count):
+        """count rows starting at idx were removed from the data source (e.g. a tree node collapsed)."""
+        if count <= 0:
+            return
+        self.layout.delete(idx, count)
+        self._shift_rows(idx, -count)
+
+    def _shift_rows(self, idx, delta):
+        """Row indices from idx on moved by delta: keep scroll, follow cursor and hover, redraw."""
+        def shifted(row):
+            if row < idx:
+                return row
+            if delta < 0 and row < idx - delta:
+                return -1  # The row itself was removed
+            return row + delta
+        self.focus_index = shifted(self.focus_index)
+        self.hover_index = shifted(self.hover_index)
+        if self.selection.anchor >= 0:
+            self.selection.anchor = shifted(self.selection.anchor)
+        if self._window_start + len(self._window) > idx:
+            self._window_start, self._window = 0, []
+        self._update_scrollregion()
+        self.request_redraw()
+
+    def refresh_item(self, idx):
+        """Re-measure row idx after its item changed (O(log n)) and redraw."""
+        if not (0 <= idx < len(self.data)):
+            return
+        self.layout.set_height(idx, self._get_row_height(self._get_item(idx)))
+        self._update_scrollregion()
+        self.request_redraw()
+
+    def _get_item(self, idx):
+        """Item of row idx from the fetched window (None while it is not loaded)."""
+        offset = idx - self._window_start
+        if 0 <= offset < len(self._window):
+            return self._window[offset]
+        items = self.data.get_range(idx, idx + 1)
+        return items[0] if items else None
+
+    def _fetch_window(self, start, end):
+        """Make sure rows [start, end) are fetched, with PREFETCH_ROWS around them."""
+        window_end = self._window_start + len(self._window)
+        if start >= self._window_start and end <= window_end:
+            return
+        count = len(self.data)
+        fetch_start = max(0, start - PREFETCH_ROWS)
+        fetch_end = min(count, end + PREFETCH_ROWS)
+        items = list(self.data.get_range(fetch_start, fetch_end))
+        items.extend([None] * (fetch_end - fetch_start - len(items)))
+        self._window_start, self._window = fetch_start, items
+        
+        if (self.row_height is not None or self.detail_text is not None) and not isinstance(self.data, ListDataSource):
+            # Lazy source: rows get their real height once their item is known
+            changed = False
+            for offset, item in enumerate(items):
+                if item is not None:
+                    height = self._get_row_height(item)
+                    if height != self.layout.height_of(fetch_start + offset):
+                        self.layout.set_height(fetch_start + offset, height)
+                        changed = True
+            if changed:
+                self._update_scrollregion()
+
+    def _get_row_height(self, item):
+        if self.row_height is not None:
+            return self.row_height(item)
+        if self.detail_text is not None:
+            detail = self.detail_text(item)
+            if detail:
+                return self.item_height + DETAIL_LINE_HEIGHT * (detail.count("\n") + 1)
+        return self.item_height
+
+    def _update_scrollregion(self, width=None):
+        self.total_height = self.layout.total_height
+        if width is None:
+            width = self.canvas.winfo_width()
+        self.canvas.configure(scrollregion=(0, 0, width, self.total_height))
+
+    def get_selected_items(self):
+        rows = None
+        if self.selection.inverted:
+            # Everything but the deselected rows: only the data source knows the rows
+            rows = ((self.key_func(item), item) for item in self.data.get_range(0, len(self.data)) if item is not None)
+        return self.selection.selected_items(rows)
+    
+    def is_selected(self, item):
+        return self.selection.is_selected(self.key_func(item))
+    
+    def get_clicked_item(self):
+        return self.last_clicked_item
+    
+    def set_clicked_item(self, item):
+        self.last_clicked_item = item
+
+    def toggle_selection(self, item):
+        self.selection.toggle(self.key_func(item), item)
+    
+    def select_range(self, start, end, selected=True):
+        """Select (or deselect) rows start..end, inclusive and in either order."""
+        lo, hi = min(start, end), max(start, end)
+        items = self.data.get_range(lo, hi + 1)
+        self.selection.set_range(((self.key_func(item), item) for item in items if item is not None), selected)
+        self._repaint_visible_rows()
+    
+    def select_all(self):
+        self.selection.select_all()
+        self._repaint_visible_rows()
+    
+    def clear_selection(self):
+        self.selection.clear()
+        self._repaint_visible_rows()
+    
+    def set_focus_index(self, idx, event=None):
+        """
+        Move the keyboard cursor to row idx. Only the two rows involved are
+        repainted, unless the list has to scroll to show the new row.
+        Shift extends the selection from the anchor row (with checkboxes).
+        """
+        if not self.data:
+            return "break"
+        idx = max(0, min(len(self.data) - 1, idx))
+        old_focus, self.focus_index = self.focus_index, idx
+        if self.use_checkboxes and event is not None and event.state & 0x0001:
+            anchor = self.selection.anchor if self.selection.anchor >= 0 else max(old_focus, 0)
+            self.selection.anchor = anchor
+            self.select_range(anchor, idx)
+        else:
+            self.selection.anchor = idx
+        if not self._scroll_to_row(idx):
+            self._request_row_update(old_focus, idx)
+        return "break"
+    
+    def move_focus(self, step, event=None):
+        start = self.focus_index if self.focus_index >= 0 else self._visible_range[0] - (1 if step > 0 else 0)
+        return self.set_focus_index(start + step, event)
+    
+    def _rows_per_page(self):
+        return max(1, int(self.canvas.winfo_height() // max(1, self.layout.default_height)) - 1)
+    
+    def _scroll_to_row(self, idx):
+        """Scroll just enough to show row idx. Returns True when the view moved."""
+        if self.total_height <= 0:
+            return False
+        top = self.canvas.canvasy(0)
+        view_height = self.canvas.winfo_height()
+        row_top = self.layout.offset_of(idx)
+        row_bottom = row_top + self.layout.height_of(idx)
+        if row_top < top:
+            new_top = row_top
+        elif row_bottom > top + view_height:
+            new_top = row_bottom - view_height
+        else:
+            return False
+        self.canvas.yview_moveto(new_top / self.total_height)
+        self.request_redraw()
+        return True
+    
+    def _repaint_visible_rows(self):
+        """Selection changed on rows that may be on screen: repaint those rows only."""
+        self._request_row_update(*range(*self._visible_range))
+    
+    def _on_activate(self, event):
+        """Return on the cursor row acts like a click on it."""
+        item = self._get_item(self.focus_index) if 0 <= self.focus_index < len(self.data) else None
+        if item is not None:
+            self.set_clicked_item(item)
+            if self.command_click:
+                self.command_click(item)
+        return "break"
+    
+    def _on_space(self, event):
+        if self.use_checkboxes and 0 <= self.focus_index < len(self.data):
+            item = self._get_item(self.focus_index)
+            if item is not None:
+                self.toggle_selection(item)
+                self._request_row_update(self.focus_index)
+        return "break"
+    
+    def _on_select_all(self, event):
+        if self.use_checkboxes:
+            self.select_all()
+        return "break"
+
+    def request_redraw(self):
+        """
+        Mark the list dirty. However many requests arrive, the redraw runs once:
+        at idle if the last frame is older than FRAME_MS, otherwise when it ends.
+        """
+        self._needs_redraw = True
+        if self._redraw_scheduled:
+            return
+        self._redraw_scheduled = True
+        wait_ms = FRAME_MS - (time.perf_counter() - self._last_frame_time) * 1000
+        if wait_ms <= 0:
+            self.canvas.after_idle(self._run_scheduled_redraw)
+        else:
+            self.canvas.after(int(wait_ms) + 1, self._run_scheduled_redraw)
+
+    def _run_scheduled_redraw(self):
+        self._redraw_scheduled = False
+        if not self._needs_redraw:
+            return
+        self._needs_redraw = False
+        self._dirty_rows.clear()  # The full redraw covers them
+        self._last_frame_time = time.perf_counter()
+        self._redraw()
+
+    def _request_row_update(self, *rows):
+        """Hover fast path: repaint only these rows at idle, unless a full redraw is due anyway."""
+        self._dirty_rows.update(rows)
+        if not self._rows_scheduled:
+            self._rows_scheduled = True
+            self.canvas.after_idle(self._flush_row_updates)
+
+    def _flush_row_updates(self):
+        self._rows_scheduled = False
+        rows, self._dirty_rows = self._dirty_rows, set()
+        if self._needs_redraw:
+            return
+        for idx in rows:
+            self._update_row(idx)
+
+    def _on_scrollbar(self, *args):
+        """Handle scrollbar interaction."""
+        self.stop_scrolling()
+        self.canvas.yview(*args)
+        self.request_redraw()
+
+    def _on_configure(self, event):
+        """Handle canvas resize."""
+        self._update_scrollregion(event.width)
+        self.request_redraw()
+
+    def _on_mousewheel(self, event):
+        """Handle mouse wheel scroll: accumulate the distance, the scroll timer applies it."""
+        if not self.data or self.total_height <= 0:
+            return
+        
+        if hasattr(event, 'delta') and event.delta:
+            delta = event.delta
+            if abs(delta) >= 120:
+                pixels = -delta / 120 * WHEEL_STEP_PX
+            else:
+                pixels = -delta * FINE_DELTA_PX
+        elif event.num == 4:
+            pixels = -WHEEL_STEP_PX
+        elif event.num == 5:
+            pixels = WHEEL_STEP_PX
+        else:
+            return
+        self.scroll_by(pixels)
+    
+    def scroll_by(self, pixels):
+        """Scroll by a number of pixels on the next frame (gliding there when kinetic)."""
+        if self.kinetic:
+            # An impulse: the velocity decays geometrically, covering exactly this distance in total
+            self._scroll_velocity += pixels * (1 - SCROLL_FRICTION)
+        else:
+            self._scroll_pending += pixels
+        if self._scroll_timer is None:
+            self._scroll_timer = self.canvas.after(FRAME_MS, self._scroll_tick)
+    
+    def stop_scrolling(self):
+        """Drop accumulated and kinetic motion (e.g. the scrollbar was grabbed)."""
+        self._scroll_pending = self._scroll_velocity = 0.0
+        if self._scroll_timer is not None:
+            self.canvas.after_cancel(self._scroll_timer)
+            self._scroll_timer = None
+    
+    def _scroll_tick(self):
+        """One frame of the scrolling engine: apply what accumulated, then decay the glide."""
+        self._scroll_timer = None
+        pixels, self._scroll_pending = self._scroll_pending, 0.0
+        pixels += self._scroll_velocity
+        self._scroll_velocity *= SCROLL_FRICTION
+        if abs(self._scroll_velocity) < MIN_SCROLL_VELOCITY:
+            self._scroll_velocity = 0.0
+        
+        # Whole pixels now, the fraction carries over to the next frame
+        whole = int(pixels)
+        self._scroll_pending += pixels - whole
+        if whole and not self._move_view(whole):
+            self._scroll_velocity = 0.0  # Hit the top or bottom
+        if self._scroll_velocity:
+            self._scroll_timer = self.canvas.after(FRAME_MS, self._scroll_tick)
+    
+    def _move_view(self, pixels):
+        """
+        Move the view by pixels, clamped to the list. Tk scrolls the whole canvas
+        at once; the redraw then only updates the rows that came into view.
+        Returns False when the view could not move.
+        """
+        top = self.canvas.canvasy(0)
+        max_top = max(0.0, self.total_height - self.canvas.winfo_height())
+        new_top = min(max_top, max(0.0, top + pixels))
+        if new_top == top:
+            return False
+        self.canvas.yview_moveto(new_top / self.total_height)
+        self.request_redraw()
+        return True
+    
+    def _on_click(self, event):
+        """Handle click on an item."""
+        idx = self._get_index_at_y(event.y)
+        if 0 <= idx < len(self.data):
+            item = self._get_item(idx)
+            if item is None:
+                return  # Placeholder of a row not loaded yet
+            self.canvas.focus_set()
+            self.set_clicked_item(item)
+            old_focus, self.focus_index = self.focus_index, idx
+            if self.use_checkboxes and event.state & 0x0001 and self.selection.anchor >= 0:
+                self.select_range(self.selection.anchor, idx)
+            else:
+                self.selection.anchor = idx
+                if self.use_checkboxes:
+                    self.toggle_selection(item)
+            self._request_row_update(old_focus, idx)
+            if self.command_click:
+                self.command_click(item)
+
+    def _on_double_click(self, event):
+        """Handle double-click on an item."""
+        idx = self._get_index_at_y(event.y)
+        if 0 <= idx < len(self.data):
+            item = self._get_item(idx)
+            if item is None:
+                return
+            self.last_clicked_item = item # Update last clicked
+            if self.command_double_click:
+                self.command_double_click(item)
+            self.request_redraw()
+
+    def _on_motion(self, event):
+        """Handle mouse motion for hover effect."""
+        new_hover = self._get_index_at_y(event.y)
+        if new_hover != self.hover_index:
+            old_hover = self.hover_index
+            self.hover_index = new_hover
+            # Only the rows losing and gaining the hover change
+            self._request_row_update(old_hover, new_hover)
+
+    def _on_leave(self, event):
+        """Handle mouse leaving the canvas."""
+        if self.hover_index != -1:
+            old_hover = self.hover_index
+            self.hover_index = -1
+            self._request_row_update(old_hover)
+
+    def _get_index_at_y(self, canvas_y):
+        """Get the data index at a given canvas y coordinate."""
+        if not self.data:
+            return -1
+        # Convert canvas y to scroll position
+        scroll_top = self.canvas.canvasy(0)
+        actual_y = scroll_top + canvas_y
+        if actual_y < 0 or actual_y >= self.layout.total_height:
+            return -1
+        return self.layout.index_at(actual_y)
+
+    def _get_item_colors(self, item, is_hovered, is_selected, is_focused=False):
+        """Get colors for an item based on its type and state."""
+        asset_type = getattr(item, 'asset_type', 'default')
+        key = (asset_type, is_hovered, is_selected, is_focused)
+        cached = self._color_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        colors = self.type_colors.get(asset_type, self.type_colors['default'])
+        
+        if is_hovered:
+            bg = colors['hover']
+        else:
+            bg = colors['bg']
+        
+        text_color = colors['text']
+        if is_selected:
+            border_color = '#00E676'
+        elif is_focused:
+            border_color = FOCUS_BORDER_COLOR
+        else:
+            border_color = text_color
+        
+        cached = self._color_cache[key] = (bg, text_color, border_color)
+        return cached
+
+    def _get_display_text(self, item, is_selected):
+        """Get the display text for an item."""
+        if hasattr(item, 'name'):
+            if self.use_checkboxes:
+                prefix = "☑" if is_selected else "☐"
+                return f"  {prefix} {item.name}"
+            return f"  {item.name}"
+        return f"  {str(item)}"
+
+    def _redraw(self):
+        """Bring the pooled canvas items in line with the visible rows, touching only what changed."""
+        if not profiler.enabled:
+            self._redraw_rows()
+            return
+        with profiler.span("redraw") as span:
+            rows_changed, canvas_calls = self._redraw_rows()
+            start_idx, end_idx = self._visible_range
+            span.set(rows=end_idx - start_idx, changed=rows_changed, tcl_calls=canvas_calls)
+    
+    def _redraw_rows(self):
+        """Body of _redraw. Returns (rows changed, canvas calls issued)."""
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        
+        if not self.data or canvas_width <= 1 or canvas_height <= 1:
+            self._visible_range = (0, 0)
+            calls = 0
+            for slot in range(len(self._pool)):
+                calls += self._hide_slot(slot)
+            return 0, calls
+        
+        # Get visible range
+        scroll_top = self.canvas.canvasy(0)
+        scroll_bottom = scroll_top + canvas_height
+        
+        start_idx, end_idx = self.layout.visible_range(scroll_top, scroll_bottom)
+        self._fetch_window(start_idx, end_idx)
+        # Heights of freshly fetched rows may have moved the visible range
+        start_idx, end_idx = self.layout.visible_range(scroll_top, scroll_bottom)
+        self._fetch_window(start_idx, end_idx)
+        self._visible_range = (start_idx, end_idx)
+        
+        # One slot per row that can be visible at once (a partial row at each edge)
+        self._ensure_pool(int(canvas_height // max(1, self.layout.min_height)) + 2)
+        pool_size = len(self._pool)
+        
+        used_slots = set()
+        rows_changed = calls = 0
+        for idx in range(start_idx, end_idx):
+            slot = idx % pool_size
+            used_slots.add(slot)
+            row_calls = self._draw_row(slot, idx, canvas_width)
+            if row_calls:
+                rows_changed += 1
+                calls += row_calls
+        for slot in range(pool_size):
+            if slot not in used_slots:
+                calls += self._hide_slot(slot)
+        return rows_changed, calls
+    
+    def _row_state(self, idx, canvas_width):
+        """Everything that defines how row idx looks: position, colors and text."""
+        item = self._get_item(idx)
+        
+        # Dimensions
+        margin_left = 12
+        margin_right = 18
+        item_width = canvas_width - margin_left - margin_right
+        item_actual_height = self.layout.height_of(idx) - 8
+        
+        # Check if item has depth (for tree nodes)
+        item_depth = getattr(item, 'depth', 0) if hasattr(item, 'depth') else 0
+        depth_margin = item_depth * 30  # 30 pixels per depth level for better visibility
+        
+        # Calculate position with depth margin
+        y_top = self.layout.offset_of(idx) + 3
+        y_bottom = y_top + item_actual_height
+        x_left = margin_left + depth_margin
+        x_right = margin_left + item_width  # Keep right edge fixed
+        
+        # Get colors
+        is_hovered = (idx == self.hover_index)
+        if item is None:
+            # Not loaded yet: placeholder row
+            return (x_left, y_top, x_right, y_bottom), (PLACEHOLDER_COLORS['hover'] if is_hovered else PLACEHOLDER_COLORS['bg'],
+                    PLACEHOLDER_COLORS['text']), ("  …", PLACEHOLDER_COLORS['text'])
+        is_selected = self.selection.is_selected(self.key_func(item))
+        bg_color, text_color, border_color = self._get_item_colors(item, is_hovered, is_selected, idx == self.focus_index)
+        display_text = self._get_display_text(item, is_selected)
+        if self.detail_text is not None:
+            detail = self.detail_text(item)
+            if detail:
+                display_text += "\n" + "\n".join(f"     {line}" for line in detail.split("\n"))
+        return (x_left, y_top, x_right, y_bottom), (bg_color, border_color), (display_text, text_color)
+    
+    def _draw_row(self, slot, idx, canvas_width):
+        """
+        Update the items of a slot to show row idx, only where its drawn state
+        differs. Returns the number of canvas calls issued.
+        """
+        polygon_id, text_id, drawn = self._pool[slot]
+        geometry, box_colors, text_state = self._row_state(idx, canvas_width)
+        fresh = not isinstance(drawn, tuple)
+        if not fresh and drawn == (geometry, box_colors, text_state):
+            return 0
+        
+        calls = 0
+        corner_radius = 8
+        if fresh or drawn[0] != geometry:
+            x_left, y_top, x_right, y_bottom = geometry
+            self.canvas.coords(polygon_id, self._row_shape(x_left, y_top, x_right, y_bottom, corner_radius))
+            self.canvas.coords(text_id, x_left + 12, (y_top + y_bottom) / 2)
+            calls += 2
+        if fresh or drawn[1] != box_colors:
+            self.canvas.itemconfigure(polygon_id, fill=box_colors[0], outline=box_colors[1])
+            calls += 1
+        if fresh or drawn[2] != text_state:
+            self.canvas.itemconfigure(text_id, text=text_state[0], fill=text_state[1])
+            calls += 1
+        if fresh:
+            self.canvas.itemconfigure(polygon_id, state="normal")
+            self.canvas.itemconfigure(text_id, state="normal")
+            calls += 2
+        self._pool[slot][2] = (geometry, box_colors, text_state)
+        return calls
+    
+    def _update_row(self, idx):
+        """Redraw a single row if it is on screen (hover and selection changes)."""
+        start_idx, end_idx = self._visible_range
+        if not self._pool or not (start_idx <= idx < end_idx):
+            return
+        self._draw_row(idx % len(self._pool), idx, self.canvas.winfo_width())
+    
+    def _ensure_pool(self, size):
+        """Create hidden row items until the pool has at least size slots."""
+        if len(self._pool) >= size:
+            return
+        while len(self._pool) < size:
+            polygon_id = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, width=2, smooth=True, state="hidden")
+            text_id = self.canvas.create_text(
+                0, 0, anchor="w", font=self.row_font, state="hidden"
+            )
+            self._pool.append([polygon_id, text_id, None])
+        # Slots depend on the pool size: every row must be placed again
+        self._invalidate_rows()
+    
+    def _hide_slot(self, slot):
+        polygon_id, text_id, drawn = self._pool[slot]
+        if drawn is None:
+            return 0
+        self.canvas.itemconfigure(polygon_id, state="hidden")
+        self.canvas.itemconfigure(text_id, state="hidden")
+        self._pool[slot][2] = None
+        return 2
+    
+    def _invalidate_rows(self):
+        """Forget what each slot shows, so the next redraw updates every visible row."""
+        for entry in self._pool:
+            if entry[2] is not None:
+                entry[2] = _STALE
+    
+    def _row_shape(self, x1, y1, x2, y2, radius):
+        """Rounded rectangle points from a template cached per width and height, shifted to y1."""
+        key = (x1, x2, y2 - y1, radius)
+        template = self._shape_templates.get(key)
+        if template is None:
+            if len(self._shape_templates) >= MAX_SHAPE_TEMPLATES:
+                self._shape_templates.clear()
+            template = self._shape_templates[key] = self._rounded_rect_points(x1, 0, x2, y2 - y1, radius)
+        points = list(template)
+        points[1::2] = [y + y1 for y in template[1::2]]
+        return points
+
+    def _rounded_rect_points(self, x1, y1, x2, y2, radius):
+        """Points of a rounded rectangle drawn as a smoothed polygon."""
+        return [
+            x1 + radius, y1,       # Top edge start
+            x2 - radius, y1,       # Top edge end
+            x2, y1,                # Top right corner control
+            x2, y1 + radius,       # Right edge start
+            x2, y2 - radius,       # Right edge end
+            x2, y2,                # Bottom right corner control
+            x2 - radius, y2,       # Bottom edge start
+            x1 + radius, y2,       # Bottom edge end
+            x1, y2,                # Bottom left corner control
+            x1, y2 - radius,       # Left edge start
+            x1, y1 + radius,       # Left edge end
+            x1, y1,                # Top left corner control
+            x1 + radius, y1        # Back to start
+        ]
+
+    def _draw_rounded_rect(self, x1, y1, x2, y2, radius, fill, outline):
+        """Draw a rounded rectangle on the canvas."""
+        return self.canvas.create_polygon(
+            self._rounded_rect_points(x1, y1, x2, y2, radius),
+            fill=fill, 
+            outline=outline, 
+            width=2,
+            smooth=True
+        )